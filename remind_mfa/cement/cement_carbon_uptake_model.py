@@ -1,9 +1,17 @@
 import string
+from typing import Optional
 import numpy as np
+import scipy.fft
 import flodym as fd
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
 
 from remind_mfa.common.assumptions_doc import add_assumption_doc
+from remind_mfa.common.profiling import profiled
+
+# rough number of full-size temporaries in the end-of-life carbonation, used for chunking
+N_COHORT_TEMPORARIES = 2
+N_SHARE_TEMPORARIES = 12
+N_INFLOW_TEMPORARIES = 4
 
 
 class CementCarbonUptakeModel(BaseModel):
@@ -11,6 +19,9 @@ class CementCarbonUptakeModel(BaseModel):
     flows: dict[str, fd.Flow] = Field(default_factory=dict)
     stocks: dict[str, fd.Stock] = Field(default_factory=dict)
     parameters: dict[str, fd.Parameter] = Field(default_factory=dict)
+    memory_budget_mb: Optional[float] = None
+    """Memory budget for the end-of-life carbonation. If set, it is computed in chunks of regions."""
+    _cohort_matrices: dict[tuple[str, str], np.ndarray] = PrivateAttr(default_factory=dict)
 
     @model_validator(mode="after")
     def extract_mfa_components(self):
@@ -19,6 +30,7 @@ class CementCarbonUptakeModel(BaseModel):
         self.parameters = self.mfa.parameters
         return self
 
+    @profiled
     def compute_carbon_flow(self):
         flw = self.flows
         stk = self.stocks
@@ -156,43 +168,26 @@ class CementCarbonUptakeModel(BaseModel):
         # share of product that carbonates for each age
         rel_add = d_add / self.parameters["product_thickness"]
 
-        # (II) calculate carbonation for each time step
-        carbonation = fd.FlodymArray(dims=stk_dims)
-
-        for t in range(1, stk._n_t):
-            # prepare dimension slices according to the current time step
-            sliced_ageletter = self.get_unused_dimletter(exclude_letters=ageletter)
-            sliced_age_dim = fd.Dimension(
-                name="sliced age",
-                letter=sliced_ageletter,
-                items=ages[len(ages) - t - 1 :],
-                dtype=int,
-            )
-            sliced_agedimset = fd.DimensionSet(dim_list=[sliced_age_dim])
-            sliced_timeletter = self.get_unused_dimletter(
-                exclude_letters=[ageletter, sliced_ageletter]
-            )
-            sliced_t_dim = fd.Dimension(
-                name="sliced time",
-                letter=sliced_timeletter,
-                items=stk_dims["t"].items[: t + 1],
-                dtype=int,
-            )
+        # (II) calculate carbonation for all time steps at once
+        # cohort c has age t - c at time t, such that the kernel over (t, c) is a Toeplitz matrix
+        cohortletter = self.get_unused_dimletter(exclude_letters=ageletter)
+        cohort_dim = fd.Dimension(
+            name="cohort", letter=cohortletter, items=stk_dims["t"].items, dtype=int
+        )
+        rel_add_by_cohort = age_to_cohort_kernel(rel_add, ageletter, stk_dims["t"], cohort_dim)
 
-            # get age cohort of products at time t
-            _, mass_values = get_age_distribution(stk, t)
-            mass_dims = sliced_agedimset.union_with(stk.dims).drop("t")
-            mass = fd.FlodymArray(dims=mass_dims, values=mass_values)
+        # stock of each cohort at each time step
+        mass_dims = fd.DimensionSet(dim_list=[stk_dims["t"], cohort_dim]).union_with(stk_dims)
+        mass = fd.FlodymArray(dims=mass_dims, values=self.get_cohort_matrix("in_use", "stock"))
 
-            # slice parameters as necessary
-            rel_add_sliced = rel_add[{ageletter: sliced_age_dim}]
-            f_sliced = f_in[{"t": sliced_t_dim}]  # time dimension from time-dependent clinker ratio
-            f_sliced.dims.replace(sliced_timeletter, sliced_age_dim, inplace=True)
+        # time dimension from time-dependent clinker ratio is the time of production, i.e. cohort
+        f_by_cohort = fd.FlodymArray(dims=f_in.dims.replace("t", cohort_dim), values=f_in.values)
 
-            # calculate carbonated mass convert to CO2
-            carbonated_mass = mass * rel_add_sliced
-            carbonated_co2 = carbonated_mass * f_sliced
-            carbonation[{"t": stk_dims["t"].items[t]}] = carbonated_co2.sum_over(sliced_ageletter)
+        # contract over cohorts without materializing the product of all three arrays
+        operands = (mass, rel_add_by_cohort, f_by_cohort)
+        subscripts = ",".join(o.dims.string for o in operands) + "->" + stk_dims.string
+        values = np.einsum(subscripts, *(o.values for o in operands), optimize=True)
+        carbonation = fd.FlodymArray(dims=stk_dims, values=values)
 
         return carbonation
 
@@ -258,39 +253,15 @@ class CementCarbonUptakeModel(BaseModel):
             ),
         )
 
-        prm = self.parameters
-        stk_in_use = self.stocks["in_use"]
-        k_free_arr = k_free_in.cast_values_to(stk_in_use.dims)
-        thickness_in = self.parameters["product_thickness"].cast_values_to(stk_in_use.dims)
-
-        uncarbonated_inflow = np.zeros(stk_in_use.dims.shape)
-
-        for t in range(1, self.stocks["in_use"]._n_t):
-
-            # (I1) get outflow by cohort
-            ages, inflow = get_age_distribution(self.stocks["in_use"], t, data_type="outflow")
-
-            # (I2) get carbonation depth by cohort
-            k_free = k_free_arr[: t + 1, ...]
-            d_in_use = np.sqrt(np.maximum(ages - 1, 0)) * k_free
-
-            # (I3) calculate uncarbonated mass by cohort
-            thickness = thickness_in[: t + 1, ...]
-            d_available = np.maximum(thickness - d_in_use, 0)
-            uncarbonated_fraction = d_available / thickness
-
-            # (I4) sum over all age cohorts, convert to flodym array
-            uncarbonated_inflow[t] = (inflow * uncarbonated_fraction).sum(axis=(0))
-
-        uncarbonated_inflow = fd.FlodymArray(dims=stk_in_use.dims, values=uncarbonated_inflow)
-
-        # (II) calculate further carbonation in EOL stock
+        demolition_time = 0.4  # years
+        add_assumption_doc(
+            type="literature value",
+            name="Lifetime of cement products in demolition phase.",
+            value=demolition_time,
+            description=f"Based on Cao2024, cement products are assumed to be exposed to air for {demolition_time:.1f} years after demolition, before they are either recycled or buried.",
+        )
 
         eol_dims = self.stocks["eol"].dims
-        # split inflow by waste type and size, reduce unnecessary dimensions
-        uncarbonated_inflow = (
-            uncarbonated_inflow.sum_to(eol_dims) * prm["waste_type_split"] * prm["waste_size_share"]
-        )
 
         # create new age dimension
         # Context for why list comprehension is used instead of np.arange():
@@ -302,27 +273,134 @@ class CementCarbonUptakeModel(BaseModel):
         agedimset = fd.DimensionSet(dim_list=[agedim])
         age = fd.FlodymArray(dims=agedimset, values=np.array(ages), dtype=float)
 
-        # (II1) calculate t from demolition
-        demolition_time = 0.4  # years
-        add_assumption_doc(
-            type="literature value",
-            name="Lifetime of cement products in demolition phase.",
-            value=demolition_time,
-            description=f"Based on Cao2024, cement products are assumed to be exposed to air for {demolition_time:.1f} years after demolition, before they are either recycled or buried.",
+        # both stages are computed in chunks of regions if memory is limited
+        region_chunks = self.get_region_chunks(
+            self.eol_bytes_per_region(k_free_in), exclude_letters=ageletter
         )
+
+        # (I) outflow from in-use stock that has not been carbonated yet
+        uncarbonated_inflow = self.get_uncarbonated_eol_inflow(k_free_in, region_chunks)
+        uncarbonated_inflow = uncarbonated_inflow.sum_to(eol_dims)
+
+        # (II) calculate further carbonation in EOL stock
+
+        # (II1) calculate t from demolition
         demolition_age = fd.FlodymArray(
             dims=agedimset, values=np.full_like(ages, demolition_time, dtype=float)
         )
 
         # equivalent age after demolition that the waste would have needed if carbonated buried
         equivalent_demolition_age = demolition_age * (k_free_in / k_buried_in) ** 2
-        age_after_demolition = equivalent_demolition_age + age - demolition_time
+        # cast age, since adding arrays sums over the dimensions they do not share
+        age_after_demolition = (
+            equivalent_demolition_age
+            + age.cast_to(equivalent_demolition_age.dims)
+            - demolition_time
+        )
+
+        # (II2-II6) carbonation of the uncarbonated inflow
+        inputs = {
+            "uncarbonated_inflow": uncarbonated_inflow,
+            "f_in": f_in,
+            "k_free_in": k_free_in,
+            "k_buried_in": k_buried_in,
+            "age_after_demolition": age_after_demolition,
+        }
+        waste_prm_names = [
+            "waste_type_split",
+            "waste_size_share",
+            "waste_size_min",
+            "waste_size_max",
+        ]
+        waste_prm = {name: self.parameters[name] for name in waste_prm_names}
+
+        if region_chunks is None:
+            return self.eol_carbonation(
+                **inputs, ageletter=ageletter, waste_prm=waste_prm, dims_out=eol_dims
+            )
+
+        uptake = fd.FlodymArray(dims=eol_dims)
+        region_axis = eol_dims.index("r")
+        for region_chunk, region_slice in zip(region_chunks, self.get_region_slices(region_chunks)):
+            chunk_uptake = self.eol_carbonation(
+                **{name: select_items(arr, region_chunk) for name, arr in inputs.items()},
+                ageletter=ageletter,
+                waste_prm={
+                    name: select_items(arr, region_chunk) for name, arr in waste_prm.items()
+                },
+                dims_out=eol_dims.replace("r", region_chunk),
+            )
+            uptake.values[(slice(None),) * region_axis + (region_slice,)] = chunk_uptake.values
+
+        return uptake
+
+    def get_uncarbonated_eol_inflow(
+        self, k_free_in: fd.FlodymArray, region_chunks: Optional[list[fd.Dimension]] = None
+    ) -> fd.FlodymArray:
+        """
+        Outflow from in-use stock that has not been carbonated yet, summed over all cohorts.
+        If region_chunks are given, the (time x cohort) arrays are only built for one chunk at a time.
+        """
+        stk_in_use = self.stocks["in_use"]
+        k_free_arr = k_free_in.cast_values_to(stk_in_use.dims)
+        thickness_in = self.parameters["product_thickness"].cast_values_to(stk_in_use.dims)
+
+        # (I1) get outflow by cohort
+        outflow_by_cohort = self.get_cohort_matrix("in_use", "outflow")
+
+        n_t = stk_in_use._n_t
+        ages = np.arange(n_t)[:, np.newaxis] - np.arange(n_t)[np.newaxis, :]
+        ages = ages.reshape(ages.shape + (1,) * (outflow_by_cohort.ndim - 2))
+        sqrt_ages = np.sqrt(np.maximum(ages - 1, 0))
+
+        uncarbonated_inflow = np.zeros(stk_in_use.dims.shape)
+        region_axis = stk_in_use.dims.index("r")
+        for region_slice in self.get_region_slices(region_chunks):
+            idx = (slice(None),) * region_axis + (region_slice,)
+
+            # (I2) get carbonation depth by time and cohort; cohorts younger than the system have no outflow
+            d_in_use = sqrt_ages * k_free_arr[idx][np.newaxis, ...]
+
+            # (I3) calculate uncarbonated mass by cohort, in place to avoid full-size temporaries
+            thickness = thickness_in[idx][np.newaxis, ...]
+            uncarbonated_fraction = np.subtract(thickness, d_in_use, out=d_in_use)
+            np.maximum(uncarbonated_fraction, 0, out=uncarbonated_fraction)
+            uncarbonated_fraction /= thickness
+
+            # (I4) sum over all age cohorts
+            uncarbonated_inflow[idx] = np.einsum(
+                "tc...,tc...->t...", outflow_by_cohort[(slice(None),) + idx], uncarbonated_fraction
+            )
+
+        # outflow in the first time step is not considered
+        uncarbonated_inflow[0, ...] = 0.0
+        return fd.FlodymArray(dims=stk_in_use.dims, values=uncarbonated_inflow)
+
+    def eol_carbonation(
+        self,
+        uncarbonated_inflow: fd.FlodymArray,
+        f_in: fd.FlodymArray,
+        k_free_in: fd.FlodymArray,
+        k_buried_in: fd.FlodymArray,
+        age_after_demolition: fd.FlodymArray,
+        ageletter: str,
+        waste_prm: dict[str, fd.FlodymArray],
+        dims_out: fd.DimensionSet,
+    ) -> fd.FlodymArray:
+        """
+        Carbonation during end-of-life of the uncarbonated inflow into the EOL stock.
+        All inputs may be restricted to a subset of regions, which is then also contained in dims_out.
+        """
+        # split inflow by waste type and size
+        uncarbonated_inflow = (
+            uncarbonated_inflow * waste_prm["waste_type_split"] * waste_prm["waste_size_share"]
+        )
 
         # (II2) calculated d from carbonation during eol
         # create effective k with waste dimension: recycled concrete is exposed to air, rest buried
         k = k_buried_in.cast_to(
             k_buried_in.dims.union_with(
-                fd.DimensionSet(dim_list=[prm["waste_type_split"].dims["w"]])
+                fd.DimensionSet(dim_list=[waste_prm["waste_type_split"].dims["w"]])
             )
         )
         k["new concrete"] = k_free_in
@@ -334,49 +412,93 @@ class CementCarbonUptakeModel(BaseModel):
         )  # append 0 to match dimensions
 
         # (II4) convert carbonation depth to volume by spherical particle model
-        a = prm["waste_size_min"]
-        b = prm["waste_size_max"]
+        a = waste_prm["waste_size_min"]
+        b = waste_prm["waste_size_max"]
         sphere_volume = get_volume_sphere(a, b)
         carbonation_volume = get_volume_sphere_slice(a, b, d, d_add)
         carbonation_share = carbonation_volume / sphere_volume
 
-        # (II5) calc carbonated product mass in each year by hard-coded convolution and subsequently convert to CO2
-        new_carbonated_mass = fd.FlodymArray(dims=eol_dims)
-        for i, t in enumerate(eol_dims["t"].items):
-            # prepare dimensions accoring to the current time step
-            sliced_ageletter = self.get_unused_dimletter(exclude_letters=ageletter)
-            sliced_age_dim = fd.Dimension(
-                name="sliced age",
-                letter=sliced_ageletter,
-                items=carbonation_share.dims[ageletter].items[len(ages) - i - 1 :],
-                dtype=int,
-            )
-            sliced_timeletter = self.get_unused_dimletter(
-                exclude_letters=[ageletter, sliced_ageletter]
-            )
-            sliced_t_dim = fd.Dimension(
-                name="sliced time",
-                letter=sliced_timeletter,
-                items=eol_dims["t"].items[: i + 1],
-                dtype=int,
-            )
-
-            # slice with new dimensions
-            sliced_carbonation_share = carbonation_share[{ageletter: sliced_age_dim}]
-            # time of inflow can be directly translated to age (earliest inflow, oldest age)
-            sliced_uncarbonated_inflow = uncarbonated_inflow[{"t": sliced_t_dim}]
-            sliced_uncarbonated_inflow.dims.replace(sliced_timeletter, sliced_age_dim, inplace=True)
-
-            # calculate carbonated mass and sum over cohorts
-            carbonated_mass = sliced_carbonation_share * sliced_uncarbonated_inflow
-            new_carbonated_mass[{"t": t}] = carbonated_mass.sum_over(sliced_ageletter)
+        # (II5) calc carbonated product mass in each year by convolution over age
+        # time of inflow can be directly translated to age (earliest inflow, oldest age)
+        new_carbonated_mass = convolve_over_age(
+            carbonation_share, ageletter, uncarbonated_inflow, dims_out=dims_out
+        )
 
         # (II6) translate carbonated product mass to co2, sum frequently to reduce dimension overhead
-        added_co2 = new_carbonated_mass.sum_to(eol_dims.union_with(f_in.dims)) * f_in
-        uptake = added_co2.sum_to(eol_dims)
+        added_co2 = new_carbonated_mass.sum_to(dims_out.union_with(f_in.dims)) * f_in
+        uptake = added_co2.sum_to(dims_out)
 
         return uptake
 
+    def eol_bytes_per_region(self, k_free_in: fd.FlodymArray) -> float:
+        """
+        Rough estimate of the memory needed per region for the end-of-life carbonation.
+        It is dominated by the (time x cohort) arrays of the in-use outflow,
+        the temporaries of the spherical particle model over age and waste size,
+        and by the inflow split by waste type and size and its spectrum.
+        """
+        prm = self.parameters
+        n_t = self.stocks["in_use"]._n_t
+        n_regions = len(self.mfa.dims["r"].items)
+        share_dims = k_free_in.dims.union_with(prm["waste_size_min"].dims)
+        inflow_dims = self.stocks["eol"].dims.union_with(prm["waste_size_share"].dims)
+        share_size = n_t * np.prod(share_dims.shape)
+        if "r" in share_dims.letters:
+            share_size /= n_regions
+        inflow_size = np.prod(inflow_dims.shape) / n_regions
+        cohort_size = n_t * np.prod(self.stocks["in_use"].dims.shape) / n_regions
+        itemsize = np.dtype(float).itemsize
+        return itemsize * max(
+            N_COHORT_TEMPORARIES * cohort_size,
+            N_SHARE_TEMPORARIES * share_size + N_INFLOW_TEMPORARIES * inflow_size,
+        )
+
+    def get_region_chunks(
+        self, bytes_per_region: float, exclude_letters=None
+    ) -> Optional[list[fd.Dimension]]:
+        """
+        Splits the regions into chunks that fit into the memory budget.
+        Each chunk is a dimension with an unused letter, containing a subset of the region items.
+        Returns None if no budget is set or all regions fit into it at once.
+        """
+        if self.memory_budget_mb is None:
+            return None
+        regions = self.mfa.dims["r"]
+        n_per_chunk = max(1, int(self.memory_budget_mb * 1e6 // bytes_per_region))
+        if n_per_chunk >= len(regions.items):
+            return None
+        letter = self.get_unused_dimletter(exclude_letters=exclude_letters)
+        return [
+            fd.Dimension(
+                name=f"{regions.name} chunk",
+                letter=letter,
+                items=regions.items[i : i + n_per_chunk],
+                dtype=regions.dtype,
+            )
+            for i in range(0, len(regions.items), n_per_chunk)
+        ]
+
+    def get_cohort_matrix(self, stock_name: str, data_type: str = "stock") -> np.ndarray:
+        """
+        Returns the (time x cohort) matrix of stock or outflow of the given stock.
+        It is retrieved and checked only once and cached for subsequent calls.
+        """
+        key = (stock_name, data_type)
+        if key not in self._cohort_matrices:
+            self._cohort_matrices[key] = get_cohort_matrix(self.stocks[stock_name], data_type)
+        return self._cohort_matrices[key]
+
+    def get_region_slices(self, region_chunks: Optional[list[fd.Dimension]]) -> list[slice]:
+        """Positions of the region chunks along the region dimension; a single full slice for None."""
+        if region_chunks is None:
+            return [slice(None)]
+        region_items = self.mfa.dims["r"].items
+        slices = []
+        for chunk in region_chunks:
+            start = region_items.index(chunk.items[0])
+            slices.append(slice(start, start + len(chunk.items)))
+        return slices
+
     def get_unused_dimletter(self, exclude_letters=None) -> str:
         """Returns a dimension letter that is not used in the MFA system or in exclude_letters."""
         used_letters = set(self.mfa.dims.letters)
@@ -491,27 +613,77 @@ def shift_with_zero(
         return fd.FlodymArray(dims=a.dims, values=out)
 
 
-def get_age_distribution(
-    stock: fd.DynamicStockModel, t: int, data_type: str = "stock"
-) -> tuple[np.ndarray, np.ndarray]:
+def age_to_cohort_kernel(
+    kernel: fd.FlodymArray, age_letter: str, time_dim: fd.Dimension, cohort_dim: fd.Dimension
+) -> fd.FlodymArray:
     """
-    Returns the histogram of ages of either stock or outflow at time step t.
-
-    Parameters
-    ----------
-    stock : fd.DynamicStockModel
-        The stock model object
-    t : int
-        The time step to analyze
-    data_type : str, optional
-        Type of data to retrieve: "stock" or "outflow", by default "stock"
-
-    Returns
-    -------
-    tuple[np.ndarray, np.ndarray]
-        A tuple containing (ages, values_by_age)
+    Maps an array over ages (ordered oldest to youngest) to an array over time and cohort,
+    i.e. result[t, c] = kernel[age=t-c] for c <= t and zero for cohorts younger than the system.
     """
+    n_t = len(time_dim.items)
+    age_axis = kernel.dims.index(age_letter)
+    if kernel.values.shape[age_axis] != n_t:
+        raise ValueError("Age dimension must have the same length as the time dimension.")
+    # reorder age to ascending (youngest first), such that age equals the index
+    by_age = np.flip(np.moveaxis(kernel.values, age_axis, 0), axis=0)
+    lag = np.arange(n_t)[:, np.newaxis] - np.arange(n_t)[np.newaxis, :]
+    is_born = (lag >= 0).reshape(lag.shape + (1,) * (by_age.ndim - 1))
+    values = np.where(is_born, by_age[np.maximum(lag, 0)], 0.0)
+    dims = fd.DimensionSet(dim_list=[time_dim, cohort_dim]).union_with(kernel.dims.drop(age_letter))
+    return fd.FlodymArray(dims=dims, values=values)
+
+
+def convolve_over_age(
+    kernel: fd.FlodymArray,
+    age_letter: str,
+    signal: fd.FlodymArray,
+    dims_out: fd.DimensionSet,
+    time_letter: str = "t",
+) -> fd.FlodymArray:
+    """
+    Discrete convolution of a kernel over age (ordered oldest to youngest) with a signal over time,
+    i.e. result[t] = sum_c kernel[age=t-c] * signal[c], evaluated by FFT along the time axis.
+    Dimensions not contained in dims_out are summed over.
+    """
+    if time_letter in kernel.dims.letters:
+        raise ValueError("Kernel must not have a time dimension besides the age dimension.")
+    n_t = len(signal.dims[time_letter].items)
+    age_axis = kernel.dims.index(age_letter)
+    if kernel.values.shape[age_axis] != n_t:
+        raise ValueError("Age dimension must have the same length as the time dimension.")
+
+    # zero-padding to at least 2 * n_t - 1 avoids wrap-around of the circular convolution
+    n_fft = scipy.fft.next_fast_len(2 * n_t - 1, real=True)
+    # reorder age to ascending (youngest first), such that age equals the index
+    kernel_spectrum = scipy.fft.rfft(np.flip(kernel.values, axis=age_axis), n=n_fft, axis=age_axis)
+    signal_spectrum = scipy.fft.rfft(signal.values, n=n_fft, axis=signal.dims.index(time_letter))
+
+    # multiply in frequency domain, summing over dimensions not in output
+    kernel_letters = kernel.dims.string.replace(age_letter, time_letter)
+    subscripts = f"{kernel_letters},{signal.dims.string}->{dims_out.string}"
+    spectrum = np.einsum(subscripts, kernel_spectrum, signal_spectrum, optimize=True)
+
+    time_axis = dims_out.index(time_letter)
+    values = scipy.fft.irfft(spectrum, n=n_fft, axis=time_axis)
+    values = np.take(values, np.arange(n_t), axis=time_axis)
+    return fd.FlodymArray(dims=dims_out, values=values)
+
+
+def select_items(arr: fd.FlodymArray, dim: fd.Dimension, letter: str = "r") -> fd.FlodymArray:
+    """
+    Restricts arr to the items of dim along the dimension with the given letter, if arr has it.
+    The returned array carries dim, i.e. the letter of dim instead of the original letter.
+    """
+    if letter not in arr.dims.letters:
+        return arr
+    return arr[{letter: dim}]
 
+
+def get_cohort_matrix(stock: fd.DynamicStockModel, data_type: str = "stock") -> np.ndarray:
+    """
+    Returns either stock or outflow by cohort as a (time x cohort) matrix,
+    after checking that there are no cohorts older than the system age at any time step.
+    """
     if data_type == "stock":
         data_by_cohort = stock.get_stock_by_cohort()
     elif data_type == "outflow":
@@ -519,16 +691,13 @@ def get_age_distribution(
     else:
         raise ValueError(f"Unknown data_type: {data_type}. Must be either 'stock' or 'outflow'")
 
-    # check if there are any cohorts older than system age
-    if not np.all(data_by_cohort[t, t + 1 :, ...] == 0):
+    # check all entries with cohort later than time at once
+    t_idx, c_idx = np.triu_indices(data_by_cohort.shape[0], k=1)
+    is_nonzero = np.any(
+        data_by_cohort[t_idx, c_idx, ...] != 0, axis=tuple(range(1, data_by_cohort.ndim - 1))
+    )
+    if np.any(is_nonzero):
+        t = t_idx[is_nonzero].min()
         raise RuntimeError(f"Nonzero {data_type} found at t={t} for cohorts older than system age!")
 
-    # select time t and all cohorts up to t from data
-    data_by_age = data_by_cohort[t, : t + 1, ...]
-
-    # Only consider cohorts c <= t
-    ages = np.arange(t + 1)[::-1]  # age 0 is newest, t is oldest
-    # reshape to match data dimensions
-    ages = ages.reshape((-1,) + (1,) * (data_by_age.ndim - 1))
-
-    return ages, data_by_age
+    return data_by_cohort
@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Optional
 from remind_mfa.common.common_config import (
     CommonCfg,
     ModelSwitches,
@@ -15,6 +16,8 @@ class CementModes(str, Enum):
 
 class CementModelSwitches(ModelSwitches):
     mode: CementModes
+    carbonation_memory_budget_mb: Optional[float] = None
+    """Memory budget in MB for the end-of-life carbonation. If set, it is computed in chunks of regions."""
 
     @property
     def carbon_flow(self) -> bool:
@@ -6,6 +6,7 @@ from remind_mfa.cement.cement_carbon_uptake_model import CementCarbonUptakeModel
 from remind_mfa.common.common_mfa_system import CommonMFASystem
 from remind_mfa.cement.cement_config import CementCfg
 from remind_mfa.common.trade import TradeSet
+from remind_mfa.common.profiling import profiled
 
 
 class StockDrivenCementMFASystem(CommonMFASystem):
@@ -24,16 +25,19 @@ class StockDrivenCementMFASystem(CommonMFASystem):
         self.compute_flows()
         self.compute_other_stocks()
         if self.cfg.model_switches.carbon_flow:
-            CementCarbonUptakeModel(mfa=self).compute_carbon_flow()
+            CementCarbonUptakeModel(
+                mfa=self, memory_budget_mb=self.cfg.model_switches.carbonation_memory_budget_mb
+            ).compute_carbon_flow()
         self.check_mass_balance()
         self.check_flows(raise_error=False)
 
+    @profiled
     def compute_in_use_stock(self, cement_stock_projection: fd.FlodymArray):
         prm = self.parameters
         stk = self.stocks
 
         # transform historic cement stock into product stock
-        stk["in_use"].stock = (
+        stk["in_use"].stock[...] = (
             cement_stock_projection
             * prm["product_material_split"]
             * prm["product_material_application_transform"]
@@ -47,6 +51,7 @@ class StockDrivenCementMFASystem(CommonMFASystem):
         )
         stk["in_use"].compute()
 
+    @profiled
     def compute_flows(self):
         prm = self.parameters
         flw = self.flows
@@ -92,6 +97,7 @@ class StockDrivenCementMFASystem(CommonMFASystem):
         ) * (1 - prm["clinker_ratio"])
         flw["sysenv => prod_product"][...] = flw["prod_product => use"] * (1 - self.cement_ratio)
 
+    @profiled
     def compute_other_stocks(self):
         flw = self.flows
         stk = self.stocks
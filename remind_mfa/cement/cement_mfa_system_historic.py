@@ -1,6 +1,7 @@
 from remind_mfa.common.assumptions_doc import add_assumption_doc
 from remind_mfa.common.common_mfa_system import CommonMFASystem
 from remind_mfa.cement.cement_config import CementCfg
+from remind_mfa.common.profiling import profiled
 
 
 class InflowDrivenHistoricCementMFASystem(CommonMFASystem):
@@ -16,6 +17,7 @@ class InflowDrivenHistoricCementMFASystem(CommonMFASystem):
         self.check_mass_balance()
         self.check_flows()
 
+    @profiled
     def compute_in_use_stock(self):
         prm = self.parameters
         stk = self.stocks
@@ -33,6 +35,7 @@ class InflowDrivenHistoricCementMFASystem(CommonMFASystem):
         )
         stk["historic_cement_in_use"].compute()
 
+    @profiled
     def compute_flows(self):
         flw = self.flows
         stk = self.stocks
@@ -14,6 +14,7 @@ from remind_mfa.cement.cement_mappings import CementDimensionFiles, CementDispla
 from remind_mfa.cement.cement_export import CementDataExporter
 from remind_mfa.cement.cement_visualization import CementVisualizer
 from remind_mfa.common.stock_extrapolation import StockExtrapolation
+from remind_mfa.common.monte_carlo import sample_letters
 from remind_mfa.common.assumptions_doc import add_assumption_doc
 from remind_mfa.common.common_model import CommonModel
 from remind_mfa.cement.cement_definition import scenario_parameters as cement_scn_prm_def
@@ -30,11 +31,19 @@ class CementModel(CommonModel):
     FutureMFASystemCls = StockDrivenCementMFASystem
     get_definition = staticmethod(get_cement_definition)
     custom_scn_prm_def = cement_scn_prm_def
+    stock_projection_parameters = (
+        "gdppc",
+        "population",
+        "stock_saturation_level",
+        "stock_type_split",
+        "use_lifetime_mean",
+        "industrialized_regions",
+    )
 
     def get_long_term_stock(self) -> fd.FlodymArray:
         """Extrapolate in use stock to future."""
 
-        indep_fit_dim_letters = ("r", "s")
+        indep_fit_dim_letters = ("r", "s") + sample_letters(self.dims)
         prm = self.parameters
 
         # 1) constrain saturation level
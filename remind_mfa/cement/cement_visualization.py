@@ -1,4 +1,3 @@
-from plotly import colors as plc
 import flodym as fd
 from typing import TYPE_CHECKING
 import numpy as np
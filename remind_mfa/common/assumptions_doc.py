@@ -1,4 +1,5 @@
-from inspect import stack, getframeinfo
+import sys
+from contextlib import contextmanager
 from pydantic import field_validator
 from typing import ClassVar, Any, Optional
 import os
@@ -7,15 +8,43 @@ import pandas as pd
 from remind_mfa.common.helpers import RemindMFABaseModel
 
 
-_assumptions = []
+class AssumptionRegistry:
+    """
+    Collects the arguments of assumptions, keyed by name and calling location, such that repeated
+    calls from the same line (e.g. in loops or repeated runs) are stored only once, with the
+    arguments of the latest call. Assumption objects are only created and validated on export.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._entries: dict[tuple[str, str, int], dict] = {}
+
+    def add(self, name: str, filename: str, line_number: int, **kwargs):
+        self._entries[(name, filename, line_number)] = kwargs
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def to_list(self) -> list["Assumption"]:
+        return [
+            Assumption(name=name, filename=filename, line_number=line_number, **kwargs)
+            for (name, filename, line_number), kwargs in self._entries.items()
+        ]
+
+
+_registry = AssumptionRegistry()
 
 
 def add_assumption_doc(
     type: str, name: str, description: str, value: str = None, source: str = None
 ):
     """
-    Add an assumption to the list of assumptions. The assumption is stored in a global list
-    and can be printed later using the print_assumptions() function.
+    Add an assumption to the list of assumptions. The assumption is stored in a global registry
+    and can be printed later using the assumptions_str() function.
+    Repeated calls from the same line with the same name are only stored once.
     Args:
         type (str): The type of the assumption. Must be one of the allowed types:
             "ad-hoc fix", "model assumption", "integer number", "expert guess", "literature value", "model switch".
@@ -25,17 +54,49 @@ def add_assumption_doc(
         value (str, optional): The value of the assumption, if applicable. Defaults to None.
         source (str, optional): The source for literature data. Defaults to None.
     """
-    caller = getframeinfo(stack()[1][0])
-    assumption = Assumption(
-        type=type,
+    if not _registry.enabled:
+        return
+    # only the calling frame is accessed, since inspecting the whole stack is slow
+    caller = sys._getframe(1)
+    _registry.add(
         name=name,
+        filename=caller.f_code.co_filename,
+        line_number=caller.f_lineno,
+        type=type,
         value=value,
         description=description,
-        filename=caller.filename,
-        line_number=caller.lineno,
         source=source,
     )
-    _assumptions.append(assumption)
+
+
+def set_assumption_doc_enabled(enabled: bool):
+    """Switch recording of assumptions on or off, e.g. if they are not exported."""
+    _registry.enabled = enabled
+
+
+def clear_assumptions():
+    """Remove all recorded assumptions, e.g. at the start of a new run."""
+    _registry.clear()
+
+
+@contextmanager
+def assumption_scope(enabled: bool = True):
+    """
+    Record assumptions in a fresh registry within the context, which is yielded.
+    The previous registry is restored afterwards, unaffected by the calls within the context.
+    """
+    global _registry
+    previous_registry = _registry
+    _registry = AssumptionRegistry(enabled=enabled)
+    try:
+        yield _registry
+    finally:
+        _registry = previous_registry
+
+
+def get_assumptions() -> list["Assumption"]:
+    """Returns all recorded assumptions as validated Assumption objects."""
+    return _registry.to_list()
 
 
 class Assumption(RemindMFABaseModel):
@@ -78,14 +139,15 @@ class Assumption(RemindMFABaseModel):
 
 
 def assumptions_str() -> str:
-    return "\n".join(str(a) for a in _assumptions)
+    return "\n".join(str(a) for a in get_assumptions())
 
 
 def assumptions_df() -> pd.DataFrame:
     """Return all assumptions as a pandas DataFrame."""
-    if not _assumptions:
+    assumptions = get_assumptions()
+    if not assumptions:
         return pd.DataFrame()
 
-    df = pd.DataFrame([a.model_dump() for a in _assumptions])
+    df = pd.DataFrame([a.model_dump() for a in assumptions])
     df["filename"] = df["filename"].apply(lambda x: os.path.relpath(x, os.path.abspath(os.curdir)))
     return df
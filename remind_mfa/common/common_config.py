@@ -4,7 +4,12 @@ import pandas as pd
 
 from remind_mfa.common.data_extrapolations import Extrapolation
 from remind_mfa.common.parameter_extrapolation import ParameterExtrapolation
-from remind_mfa.common.helpers import RemindMFABaseModel, ModelNames, RegressOverModes
+from remind_mfa.common.helpers import (
+    RemindMFABaseModel,
+    ModelNames,
+    RegressOverModes,
+    DistributionTypes,
+)
 
 
 def choose_subclass_by_name(name: str, parent: type) -> type:
@@ -34,6 +39,12 @@ class ModelSwitches(RemindMFABaseModel):
     """Whether to perform stock extrapolation by good category."""
     regress_over: RegressOverModes
     """Variable to use as a predictor for stock extrapolation."""
+    batch_regression: bool = False
+    """Whether to fit all independent slices of the stock extrapolation at once with a vectorized solver instead of one fit per slice."""
+    fit_cache_path: Optional[str] = None
+    """Directory in which fitted stock extrapolation parameters are cached across runs. If None, no caching is performed."""
+    regression_workers: int = 1
+    """Number of worker processes for fitting independent slices of the stock extrapolation in parallel. Not used for batched regression."""
     parameter_extrapolation: Optional[dict[str, str]] = None
     """Mapping of parameter names to extrapolation subclass names for parameter extrapolation from historical values into the future."""
 
@@ -76,6 +87,8 @@ class ExportCfg(BaseExportCfg):
     """Configuration of export to documentation files."""
     iamc: BaseExportCfg
     """Configuration of export of results in IAMC format."""
+    monte_carlo: BaseExportCfg = BaseExportCfg()
+    """Configuration of export of the Monte Carlo summary statistics to CSV files. Only used if a Monte Carlo run is performed."""
 
 
 class BaseVisualizationCfg(RemindMFABaseModel):
@@ -124,12 +137,59 @@ class InputCfg(RemindMFABaseModel):
     """Where to find the madrat output archives to extract input data from."""
     force_extract_tgz: bool
     """Whether to force re-extraction of input data from tgz files. If False, extraction is only performed if pre-extracted data is not up-to date."""
+    selective_extraction: bool = False
+    """Whether to extract only the files of the selected model from the tgz file, streaming them directly to their final location. Up-to-dateness is then checked with a checksum manifest instead of the version file."""
     input_data_path: str
     """Path to the input data directory."""
     scenarios_path: str
     """Path to the scenario definition directory."""
     input_data_version: str
     """Version of the input data to use"""
+    cache_parameters: bool = True
+    """Whether to cache parsed parameter files in binary format. The cache is renewed if the file, its dimensions or the input data version change."""
+    n_read_workers: int = 1
+    """Number of threads for parsing parameter files in parallel. 1 means serial reading."""
+    lazy_parameters: bool = False
+    """Whether to read each parameter only when it is first used. Parameters never used are reported after the run."""
+
+
+class ProfilingCfg(RemindMFABaseModel):
+    do_profile: bool = False
+    """Whether to record the time spent in the stages of the model run and write it to a report."""
+    track_memory: bool = False
+    """Whether to additionally record memory peaks of each stage with tracemalloc. Slows down the run considerably."""
+    path: Optional[str] = None
+    """Directory of the JSON and CSV profiling reports. Defaults to a 'profiling' sub-directory of the export path."""
+
+
+class ParameterDistribution(RemindMFABaseModel):
+    distribution: DistributionTypes = DistributionTypes.NORMAL
+    """Distribution of the samples around the parameter values read from the input data."""
+    relative_spread: float
+    """Standard deviation (normal, lognormal) or half width (uniform, triangular) of the distribution, relative to the parameter value."""
+    correlated: bool = True
+    """Whether all entries of the parameter are scaled by the same random factor in each sample. Otherwise, each entry is drawn independently."""
+    lower_bound: Optional[float] = None
+    """Value the samples are clipped to from below, e.g. 0 for shares."""
+    upper_bound: Optional[float] = None
+    """Value the samples are clipped to from above, e.g. 1 for shares."""
+
+
+class MonteCarloCfg(RemindMFABaseModel):
+    do_monte_carlo: bool = False
+    """Whether to propagate the uncertainty of the parameters given below through the model with a Monte Carlo run."""
+    parameters: dict[str, ParameterDistribution] = {}
+    """Distributions of the uncertain parameters by parameter name."""
+    n_samples: int = 100
+    """Number of samples."""
+    chunk_size: int = 25
+    """Number of samples computed at once. Limits the memory needed for vectorized computations."""
+    vectorize: bool = True
+    """Whether to compute all samples of a chunk in one run with an additional sample dimension. Falls back to batches of half the size, down to single samples, if the vectorized run fails or differs from a run of a single sample."""
+    quantiles: list[float] = [0.05, 0.25, 0.5, 0.75, 0.95]
+    """Quantiles of the flows and stocks to estimate, in addition to mean and standard deviation."""
+    seed: int = 0
+    """Seed of the random number generator. Samples do not depend on the chunk size."""
 
 
 class CommonCfg(RemindMFABaseModel):
@@ -143,6 +203,10 @@ class CommonCfg(RemindMFABaseModel):
     """Visualization configuration."""
     export: ExportCfg
     """Data export configuration."""
+    profiling: ProfilingCfg = ProfilingCfg()
+    """Configuration of the run time and memory profiling."""
+    monte_carlo: MonteCarloCfg = MonteCarloCfg()
+    """Configuration of the uncertainty propagation with Monte Carlo sampling."""
 
     def to_df(self) -> pd.DataFrame:
         """Exports configuration parameters to pandas DataFrames."""
@@ -1,7 +1,13 @@
 import os
 import glob
+import hashlib
+import json
 import tarfile
 import shutil
+from typing import Optional
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import flodym as fd
 
@@ -27,11 +33,44 @@ class CommonDataReader(fd.CompoundDataReader):
         self.input_data_path = cfg.input.input_data_path
         self.input_data_version = cfg.input.input_data_version
         self.force_extract = cfg.input.force_extract_tgz
+        self.cache_parameters = cfg.input.cache_parameters
+        self.n_read_workers = cfg.input.n_read_workers
+        self.selective_extraction = cfg.input.selective_extraction
         self.definition = definition
         self.allow_missing_values = allow_missing_values
         self.allow_extra_values = allow_extra_values
         self.prepare_input_readers()
 
+    def read_parameters(
+        self, parameter_definitions: list[fd.ParameterDefinition], dims: fd.DimensionSet
+    ) -> dict[str, fd.Parameter]:
+        """
+        Reads all parameters, optionally parsing the files in a thread pool.
+        Results are collected in the order of the definitions, such that the same error
+        is raised first as in serial reading.
+        """
+        if self.n_read_workers <= 1:
+            return super().read_parameters(parameter_definitions, dims)
+
+        with ThreadPoolExecutor(max_workers=self.n_read_workers) as executor:
+            futures = {
+                parameter_definition.name: executor.submit(
+                    self.read_parameter_values,
+                    parameter_name=parameter_definition.name,
+                    dims=dims.get_subset(parameter_definition.dim_letters),
+                )
+                for parameter_definition in parameter_definitions
+            }
+            return {name: future.result() for name, future in futures.items()}
+
+    def read_parameters_lazy(
+        self, parameter_definitions: list[fd.ParameterDefinition], dims: fd.DimensionSet
+    ) -> "LazyParameterDict":
+        """Returns a mapping that reads each parameter only on first access."""
+        return LazyParameterDict(
+            reader=self, parameter_definitions=parameter_definitions, dims=dims
+        )
+
     @property
     def tmp_extraction_path(self) -> str:
         return os.path.join(self.input_data_path, "tmp")
@@ -40,6 +79,10 @@ class CommonDataReader(fd.CompoundDataReader):
     def version_filename(self) -> str:
         return "version.txt"
 
+    @property
+    def manifest_filename(self) -> str:
+        return "manifest.json"
+
     def get_material_path(self, material: str) -> str:
         return os.path.join(self.input_data_path, material)
 
@@ -48,6 +91,11 @@ class CommonDataReader(fd.CompoundDataReader):
         parameter_foldername = "input_data"
         return os.path.join(self.get_material_path(material), parameter_foldername)
 
+    def get_material_cache_path(self, material: str) -> str:
+        # not in parameter folder, as it only contains files that are deleted on extraction
+        cache_foldername = "cache"
+        return os.path.join(self.get_material_path(material), cache_foldername)
+
     def get_material_dimension_path(self, material: str) -> str:
         dimensions_foldername = "dimensions"
         return os.path.join(self.get_material_path(material), dimensions_foldername)
@@ -60,7 +108,10 @@ class CommonDataReader(fd.CompoundDataReader):
 
         # extract tar file if needed
         if self.extraction_needed(version_file_path):
-            self.extract_tar_file()
+            if self.selective_extraction:
+                self.extract_tar_file_selective()
+            else:
+                self.extract_tar_file()
 
         # dimensions
         dimension_files = self.get_dimension_dict(material_parameter_path)
@@ -72,6 +123,10 @@ class CommonDataReader(fd.CompoundDataReader):
             parameter_files,
             allow_extra_values=self.allow_extra_values,
             allow_missing_values=self.allow_missing_values,
+            cache_path=(
+                self.get_material_cache_path(self.model_class) if self.cache_parameters else None
+            ),
+            cache_version=self.input_data_version,
         )
 
         super().__init__(dimension_reader=dimension_reader, parameter_reader=parameter_reader)
@@ -79,6 +134,8 @@ class CommonDataReader(fd.CompoundDataReader):
     def extraction_needed(self, version_file_path: str) -> bool:
         if self.force_extract:
             return True
+        if self.selective_extraction:
+            return not self.manifest_valid()
         if not os.path.exists(version_file_path):
             return True
         with open(version_file_path, "r") as f:
@@ -104,6 +161,88 @@ class CommonDataReader(fd.CompoundDataReader):
         self.delete_old_extracted_files(available_materials)
         self.move_extracted_files(available_materials)
 
+    def extract_tar_file_selective(self):
+        """
+        Streams through the tgz file from madrat output path and extracts only the parameter files
+        of the selected model and the shared files (such as the regionmapping) directly to the
+        material parameter path. Writes a manifest with checksums of all extracted files.
+        """
+        tgz_path = os.path.join(self.madrat_output_path, self.input_data_version + ".tgz")
+        if not os.path.exists(tgz_path):
+            raise FileNotFoundError(f"TGZ file not found: {tgz_path}")
+
+        material_prefix = prefix_from_module(self.model_class)
+        material_parameter_path = self.get_material_parameter_path(self.model_class)
+        self.delete_old_extracted_files({self.model_class})
+
+        checksums = {}
+        available_materials = set()
+        with tarfile.open(tgz_path, "r|gz") as tar:
+            for member in tar:
+                filename = os.path.basename(member.name)
+                # only top-level, non-hidden files, as in the full extraction
+                is_top_level = os.path.normpath(os.path.dirname(member.name)) == "."
+                if not member.isfile() or not is_top_level or filename.startswith("."):
+                    continue
+                if filename.endswith(".cs4r"):
+                    self.validate_parameter_files([filename])
+                    prefix = filename.split("_")[0]
+                    available_materials.add(module_from_prefix(prefix))
+                    if prefix != material_prefix:
+                        continue
+                checksums[filename] = self.extract_member(tar, member, material_parameter_path)
+
+        if self.model_class not in available_materials:
+            raise ValueError(
+                f"Selected tar version '{self.input_data_version}' "
+                f"does not contain parameter files for the selected model '{self.model_class}'. "
+                f"Only parameters of the following materials are available: {available_materials}."
+            )
+
+        version_file_path = os.path.join(material_parameter_path, self.version_filename)
+        with open(version_file_path, "w") as f:
+            f.write(self.input_data_version)
+        # manifest is written last, such that interrupted extractions are repeated
+        manifest = {"version": self.input_data_version, "files": checksums}
+        with open(os.path.join(material_parameter_path, self.manifest_filename), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    @staticmethod
+    def extract_member(tar: tarfile.TarFile, member: tarfile.TarInfo, target_path: str) -> str:
+        """Writes a single tar member to target_path and returns its SHA-256 checksum."""
+        sha = hashlib.sha256()
+        destination = os.path.join(target_path, os.path.basename(member.name))
+        with tar.extractfile(member) as source, open(destination, "wb") as target:
+            for chunk in iter(lambda: source.read(1 << 20), b""):
+                sha.update(chunk)
+                target.write(chunk)
+        return sha.hexdigest()
+
+    @staticmethod
+    def file_checksum(filepath: str) -> str:
+        """SHA-256 checksum of a file."""
+        sha = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def manifest_valid(self) -> bool:
+        """Checks that the manifest matches the input data version and all listed files are intact."""
+        material_parameter_path = self.get_material_parameter_path(self.model_class)
+        manifest_path = os.path.join(material_parameter_path, self.manifest_filename)
+        if not os.path.exists(manifest_path):
+            return False
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != self.input_data_version:
+            return False
+        for filename, checksum in manifest["files"].items():
+            filepath = os.path.join(material_parameter_path, filename)
+            if not os.path.exists(filepath) or self.file_checksum(filepath) != checksum:
+                return False
+        return True
+
     def prepare_tmp_extraction_path(self):
         """Makes sure the path exists and is empty."""
         if os.path.exists(self.tmp_extraction_path):
@@ -257,19 +396,75 @@ class MadratParameterReader(fd.CSVParameterReader):
     """
     Custom parameter reader for .cs4r files that extracts header and skiprows information from the file.
     Everything else inherited from flodym.CSVParameterReader.
+    If a cache path is given, parsed parameter values are stored there as .npz files and
+    re-used as long as the source file, the dimensions and the input data version are unchanged.
     """
 
-    def read_parameter_values(self, parameter_name: str, dims):
-        self.pre_read_parameter_values(parameter_name)
-        return super().read_parameter_values(parameter_name, dims)
+    def __init__(
+        self,
+        parameter_files: dict[str, str],
+        cache_path: Optional[str] = None,
+        cache_version: str = "",
+        **kwargs,
+    ):
+        super().__init__(parameter_files, **kwargs)
+        self.cache_path = cache_path
+        self.cache_version = cache_version
+
+    def read_parameter_values(self, parameter_name: str, dims: fd.DimensionSet) -> fd.Parameter:
+        if self.cache_path is None:
+            return self.parse_parameter_values(parameter_name, dims)
+
+        cache_file = os.path.join(self.cache_path, f"{parameter_name}.npz")
+        key = self.cache_key(parameter_name, dims)
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as cached:
+                if str(cached["key"]) == key:
+                    return fd.Parameter(dims=dims, name=parameter_name, values=cached["values"])
+
+        parameter = self.parse_parameter_values(parameter_name, dims)
+        os.makedirs(self.cache_path, exist_ok=True)
+        # write to temporary file first, such that parallel runs never read incomplete files
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "wb") as f:
+            np.savez(f, key=key, values=parameter.values)
+        os.replace(tmp_file, cache_file)
+        return parameter
+
+    def parse_parameter_values(self, parameter_name: str, dims: fd.DimensionSet) -> fd.Parameter:
+        read_csv_kwargs = self.pre_read_parameter_values(parameter_name)
+        datasets_path = self.parameter_filenames[parameter_name]
+        data = pd.read_csv(datasets_path, **read_csv_kwargs)
+        return fd.Parameter.from_df(
+            dims=dims,
+            name=parameter_name,
+            df=data,
+            allow_missing_values=self.allow_missing_values,
+            allow_extra_values=self.allow_extra_values,
+        )
 
-    def pre_read_parameter_values(self, parameter_name: str):
-        """Extract header and skiprows from .cs4r file and set read_csv_kwargs accordingly."""
+    def cache_key(self, parameter_name: str, dims: fd.DimensionSet) -> str:
+        """Hash of everything the parsed values depend on."""
+        stat = os.stat(self.parameter_filenames[parameter_name])
+        key_items = [
+            self.cache_version,
+            stat.st_mtime_ns,
+            stat.st_size,
+            self.allow_missing_values,
+            self.allow_extra_values,
+        ] + [(dim.letter, dim.items) for dim in dims.dim_list]
+        return hashlib.sha256(repr(key_items).encode()).hexdigest()
+
+    def pre_read_parameter_values(self, parameter_name: str) -> dict:
+        """
+        Extract header and skiprows from .cs4r file and return read_csv_kwargs accordingly.
+        They are not stored in the reader, such that several files can be read concurrently.
+        """
         if self.parameter_filenames is None:
             raise ValueError("No parameter files specified.")
         datasets_path = self.parameter_filenames[parameter_name]
         header, skiprows = self.extract_cs4r_info(datasets_path)
-        self.read_csv_kwargs = {"names": header, "skiprows": skiprows}
+        return {**self.read_csv_kwargs, "names": header, "skiprows": skiprows}
 
     @staticmethod
     def extract_cs4r_info(filepath: str):
@@ -289,3 +484,69 @@ class MadratParameterReader(fd.CSVParameterReader):
                         raise ValueError(f"No header line found in {filepath}")
                     break
         return header, idx
+
+
+class LazyParameterDict(MutableMapping):
+    """
+    Mapping of parameter names to parameters, which reads and validates each parameter only when
+    it is accessed for the first time. Parameters can be set and overwritten as in a dict.
+    Copies share the record of accessed parameters, such that `untouched` covers all of them.
+    """
+
+    def __init__(
+        self,
+        reader: fd.DataReader,
+        parameter_definitions: list[fd.ParameterDefinition],
+        dims: fd.DimensionSet,
+        loaded: Optional[dict[str, fd.Parameter]] = None,
+        accessed: Optional[set[str]] = None,
+    ):
+        self.reader = reader
+        self.definitions = {d.name: d for d in parameter_definitions}
+        self.dims = dims
+        self.loaded = {} if loaded is None else loaded
+        self.accessed = set() if accessed is None else accessed
+
+    def __getitem__(self, name: str) -> fd.Parameter:
+        if name not in self.loaded:
+            if name not in self.definitions:
+                raise KeyError(name)
+            definition = self.definitions[name]
+            self.loaded[name] = self.reader.read_parameter_values(
+                parameter_name=name, dims=self.dims.get_subset(definition.dim_letters)
+            )
+        self.accessed.add(name)
+        return self.loaded[name]
+
+    def __setitem__(self, name: str, parameter: fd.Parameter):
+        self.loaded[name] = parameter
+
+    def __delitem__(self, name: str):
+        if name not in self:
+            raise KeyError(name)
+        self.loaded.pop(name, None)
+        self.definitions.pop(name, None)
+
+    def __contains__(self, name) -> bool:
+        return name in self.loaded or name in self.definitions
+
+    def __iter__(self):
+        yield from self.definitions
+        yield from (name for name in self.loaded if name not in self.definitions)
+
+    def __len__(self) -> int:
+        return len(set(self.definitions) | set(self.loaded))
+
+    def copy(self) -> "LazyParameterDict":
+        return LazyParameterDict(
+            reader=self.reader,
+            parameter_definitions=list(self.definitions.values()),
+            dims=self.dims,
+            loaded=self.loaded.copy(),
+            accessed=self.accessed,
+        )
+
+    @property
+    def untouched(self) -> list[str]:
+        """Names of defined parameters that have never been accessed."""
+        return [name for name in self.definitions if name not in self.accessed]
@@ -2,7 +2,6 @@ import os
 from typing import Any, TYPE_CHECKING
 from pydantic import model_validator
 import flodym as fd
-import flodym.export as fde
 
 from remind_mfa.common.common_definition import RemindMFADefinition
 from remind_mfa.common.helpers import RemindMFABaseModel
@@ -27,6 +26,9 @@ class CommonDataExporter(RemindMFABaseModel):
         self.export_custom(model)
 
     def export_common(self, model: "CommonModel"):
+        # imported here, since flodym.export imports the plotting libraries, which is slow
+        import flodym.export as fde
+
         mfa = model.future_mfa
         if self.cfg.pickle.do_export:
             fde.export_mfa_to_pickle(mfa=mfa, export_path=self.export_path("pickle", "mfa.pickle"))
@@ -44,6 +46,20 @@ class CommonDataExporter(RemindMFABaseModel):
             self.cfg_to_markdown(cfg=model.cfg)
         if self.cfg.iamc.do_export:
             self.write_iamc(mfa=mfa)
+        self.export_monte_carlo(model)
+
+    def export_monte_carlo(self, model: "CommonModel"):
+        """Writes the summary statistics of each flow and stock to a CSV file."""
+        if model.monte_carlo_results is None or not self.cfg.monte_carlo.do_export:
+            return
+        from flodym.export.helper import to_valid_file_name
+
+        for name, summary in model.monte_carlo_results.items():
+            kind, _, entity = name.partition("/")
+            dir_out = os.path.join(self.export_path("monte_carlo"), kind)
+            os.makedirs(dir_out, exist_ok=True)
+            df = summary.to_df(dim_to_columns="Statistic")
+            df.to_csv(os.path.join(dir_out, f"{to_valid_file_name(entity)}.csv"))
 
     def export_custom(self, model: "CommonModel"):
         pass
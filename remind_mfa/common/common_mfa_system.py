@@ -1,14 +1,20 @@
 import flodym as fd
-from typing import Optional
+from typing import Dict, Optional, Union
+from pydantic import ConfigDict
 
 from remind_mfa.common.trade import TradeSet
 from remind_mfa.common.common_config import CommonCfg
+from remind_mfa.common.common_data_reader import LazyParameterDict
 
 
 class CommonMFASystem(fd.MFASystem):
 
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     cfg: CommonCfg
     trade_set: Optional[TradeSet] = None
+    parameters: Union[LazyParameterDict, Dict[str, fd.Parameter]]
+    """Lazily read parameters are accepted as they are, such that they are not all read on construction."""
 
     def fill_trade(self):
         """
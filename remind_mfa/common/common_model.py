@@ -1,9 +1,12 @@
+import os
+import logging
 import flodym as fd
+from copy import deepcopy
 
 from remind_mfa.common.common_config import CommonCfg
 from remind_mfa.common.scenarios import ScenarioReader
 from remind_mfa.common.common_definition import scenario_parameters as common_scn_prm_def
-from remind_mfa.common.common_data_reader import CommonDataReader
+from remind_mfa.common.common_data_reader import CommonDataReader, LazyParameterDict
 from remind_mfa.common.common_mappings import CommonDimensionFiles, CommonDisplayNames
 from remind_mfa.common.common_export import CommonDataExporter
 from remind_mfa.common.common_visualization import CommonVisualizer
@@ -11,6 +14,9 @@ from remind_mfa.common.common_mfa_system import CommonMFASystem
 from remind_mfa.common.common_definition import get_definition
 from remind_mfa.common.trade import TradeSet
 from remind_mfa.common.parameter_extrapolation import ParameterExtrapolationManager
+from remind_mfa.common.profiling import StageProfiler
+from remind_mfa.common.monte_carlo import MonteCarloEngine
+from remind_mfa.common.assumptions_doc import clear_assumptions, set_assumption_doc_enabled
 
 
 class CommonModel:
@@ -24,35 +30,120 @@ class CommonModel:
     FutureMFASystemCls = CommonMFASystem
     custom_scn_prm_def = []
     get_definition = staticmethod(get_definition)
+    # parameters read by get_long_term_stock, such that the ModelServer knows when to re-compute it
+    stock_projection_parameters = ("gdppc", "population")
 
     def __init__(self, cfg: dict):
         self.cfg = self.ConfigCls(**cfg)
-        self.set_definition()
-        self.read_data()
-        self.read_scenario_parameters()
-        self.modify_parameters()
+        self.init_assumption_doc()
+        self.profiler = StageProfiler(
+            enabled=self.cfg.profiling.do_profile,
+            track_memory=self.cfg.profiling.track_memory,
+        )
+        with self.profiler.stage("set_definition"):
+            self.set_definition()
+        with self.profiler.stage("read_data"):
+            self.read_data()
+        with self.profiler.stage("read_scenario_parameters"):
+            self.read_scenario_parameters()
+        with self.profiler.stage("modify_parameters"):
+            self.modify_parameters()
         self.init_export_and_visualization()
+        self.monte_carlo_results = None
 
     def run(self):
+        if self.cfg.monte_carlo.do_monte_carlo:
+            self.run_monte_carlo()
+        self.run_historic()
+        self.run_future()
+
+    def run_monte_carlo(self):
+        """
+        Propagates the uncertainty of the configured parameters to the flows and stocks of the
+        future MFA. Their summary statistics are stored in monte_carlo_results.
+        Must be called before run_future, which modifies the parameters the samples are drawn from.
+        """
+        with self.profiler.stage("monte_carlo"):
+            self.monte_carlo_results = MonteCarloEngine(self).run()
+
+    def run_historic(self):
+        """Scenario-independent computations: historic MFA and long-term stock projection."""
         self.historic_mfa = self.make_mfa(historic=True)
-        self.historic_mfa.compute()
+        with self.profiler.stage("historic_mfa.compute"):
+            self.historic_mfa.compute()
+
+        with self.profiler.stage("get_long_term_stock"):
+            self.stock_projection = self.get_long_term_stock()
 
+    def run_future(self):
+        """Scenario-dependent computations. Requires run_historic to be called before."""
         historic_trade = self.historic_mfa.trade_set
-        stock_projection = self.get_long_term_stock()
 
         # apply scenarios to parameters for future mfa
-        self.parameters = ParameterExtrapolationManager(
-            self.cfg, self.dims["t"]
-        ).apply_prm_extrapolation(self.parameters, self.scenario_parameters)
+        with self.profiler.stage("parameter_extrapolation"):
+            self.parameters = ParameterExtrapolationManager(
+                self.cfg, self.dims["t"]
+            ).apply_prm_extrapolation(self.parameters, self.scenario_parameters)
 
         self.future_mfa = self.make_mfa(historic=False)
-        self.future_mfa.compute(stock_projection, historic_trade)
+        with self.profiler.stage("future_mfa.compute"):
+            self.future_mfa.compute(self.stock_projection, historic_trade)
+        self.report_untouched_parameters()
+
+    def report_untouched_parameters(self):
+        """Logs the parameters that were never read if parameters are loaded lazily."""
+        if isinstance(self.parameters, LazyParameterDict) and self.parameters.untouched:
+            logging.info(f"Parameters never used: {', '.join(self.parameters.untouched)}")
+
+    def for_scenario(self, scenario: str) -> "CommonModel":
+        """
+        Returns a copy of the model for another scenario, which can be used to call run_future
+        without repeating the scenario-independent computations.
+        Export and figure paths get a sub-directory named after the scenario.
+        """
+        model = deepcopy(self)
+        model.cfg.model_switches.scenario = scenario
+        model.read_scenario_parameters()
+
+        model.cfg.export.path = os.path.join(self.cfg.export.path, scenario)
+        if model.cfg.profiling.path is not None:
+            model.cfg.profiling.path = os.path.join(self.cfg.profiling.path, scenario)
+        model.cfg.visualization.figures_path = os.path.join(
+            self.cfg.visualization.figures_path, scenario
+        )
+        if model.cfg.export.do_export:
+            os.makedirs(model.cfg.export.path, exist_ok=True)
+        if model.cfg.visualization.do_save_figs:
+            os.makedirs(model.cfg.visualization.figures_path, exist_ok=True)
+        model.init_export_and_visualization()
+        return model
 
     def export(self):
-        self.data_writer.export(model=self)
+        with self.profiler.stage("export"):
+            self.data_writer.export(model=self)
 
     def visualize(self):
-        self.visualizer.visualize(model=self)
+        with self.profiler.stage("visualize"):
+            self.visualizer.visualize(model=self)
+
+    def write_profile(self):
+        """Writes the recorded stage timings to JSON and CSV files, if profiling is enabled."""
+        path = self.cfg.profiling.path
+        if path is None:
+            path = os.path.join(self.cfg.export.path, "profiling")
+        run_info = {"model": self.cfg.model.value, "scenario": self.cfg.model_switches.scenario}
+        self.profiler.write(path=path, name="profile", run_info=run_info)
+
+    def init_assumption_doc(self):
+        """
+        Starts a fresh record of assumptions for this run, such that batch runs do not accumulate
+        them. Assumptions are only recorded if they are exported.
+        """
+        export_cfg = self.cfg.export
+        clear_assumptions()
+        set_assumption_doc_enabled(
+            export_cfg.do_export and (export_cfg.assumptions.do_export or export_cfg.docs.do_export)
+        )
 
     def set_definition(self):
         self.definition_historic = self.get_definition(self.cfg, historic=True)
@@ -65,9 +156,11 @@ class CommonModel:
             dimension_file_mapping=self.DimensionFilesCls(),
         )
         self.dims = self.data_reader.read_dimensions(self.definition_future.dimensions)
-        self.parameters = self.data_reader.read_parameters(
-            self.definition_future.parameters, dims=self.dims
-        )
+        if self.cfg.input.lazy_parameters:
+            read_parameters = self.data_reader.read_parameters_lazy
+        else:
+            read_parameters = self.data_reader.read_parameters
+        self.parameters = read_parameters(self.definition_future.parameters, dims=self.dims)
 
     def read_scenario_parameters(self):
         parameter_definitions = common_scn_prm_def + self.custom_scn_prm_def
@@ -1,18 +1,15 @@
 import os
-from matplotlib import pyplot as plt
-import plotly.graph_objects as go
-import plotly.colors as plc
-import plotly.io as pio
 from typing import Optional, TYPE_CHECKING
 from pydantic import model_validator
 import flodym as fd
-import flodym.export as fde
 
 from remind_mfa.common.helpers import RemindMFABaseModel
 from remind_mfa.common.common_config import VisualizationCfg
 from remind_mfa.common.common_mappings import CommonDisplayNames
 
 if TYPE_CHECKING:
+    import plotly.graph_objects as go
+    import flodym.export as fde
     from remind_mfa.common.common_model import CommonModel
 
 
@@ -22,7 +19,10 @@ class CommonVisualizer(RemindMFABaseModel):
 
     @model_validator(mode="after")
     def set_plotly_renderer(self):
-        if self.cfg.plotting_engine == "plotly":
+        # plotting libraries are only imported if needed, since importing them is slow
+        if self.cfg.do_visualize and self.cfg.plotting_engine == "plotly":
+            import plotly.io as pio
+
             pio.renderers.default = self.cfg.plotly_renderer
         return self
 
@@ -44,13 +44,15 @@ class CommonVisualizer(RemindMFABaseModel):
         """To be overwritten by model subclasses"""
         pass
 
-    def _show_and_save_plotly(self, fig: go.Figure, name):
+    def _show_and_save_plotly(self, fig: "go.Figure", name):
         if self.cfg.do_save_figs:
             fig.write_image(self.figure_path(f"{name}.png"))
         if self.cfg.do_show_figs:
             fig.show()
 
     def visualize_sankey(self, mfa: fd.MFASystem):
+        import flodym.export as fde
+
         plotter = fde.PlotlySankeyPlotter(
             mfa=mfa, display_names=self.display_names.dct, **self.cfg.sankey.plotter_args
         )
@@ -66,7 +68,9 @@ class CommonVisualizer(RemindMFABaseModel):
     def figure_path(self, filename: str) -> str:
         return os.path.join(self.cfg.figures_path, filename)
 
-    def plot_and_save_figure(self, plotter: fde.ArrayPlotter, filename: str, do_plot: bool = True):
+    def plot_and_save_figure(
+        self, plotter: "fde.ArrayPlotter", filename: str, do_plot: bool = True
+    ):
         if do_plot:
             plotter.plot()
         if self.cfg.do_show_figs:
@@ -76,10 +80,14 @@ class CommonVisualizer(RemindMFABaseModel):
 
     def stop_and_show(self):
         if self.cfg.plotting_engine == "pyplot" and self.cfg.do_show_figs:
+            from matplotlib import pyplot as plt
+
             plt.show()
 
     @property
     def plotter_class(self):
+        import flodym.export as fde
+
         if self.cfg.plotting_engine == "plotly":
             return fde.PlotlyArrayPlotter
         elif self.cfg.plotting_engine == "pyplot":
@@ -163,6 +171,8 @@ class CommonVisualizer(RemindMFABaseModel):
         **kwargs,
     ):
 
+        import plotly.colors as plc
+
         colors = plc.qualitative.Dark24
         if linecolor_dim:
             dimletter = next(
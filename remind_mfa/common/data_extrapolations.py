@@ -1,13 +1,17 @@
 from abc import abstractmethod
-from typing import Optional, Tuple
+from typing import Callable, ClassVar, Optional, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor
 import numpy as np
+import os
 import sys
+import atexit
 from pydantic import model_validator
 from scipy.optimize import least_squares
 from pydantic import PrivateAttr
 
 from remind_mfa.common.helpers import RemindMFABaseModel
 from remind_mfa.common.data_transformations import BoundList
+from remind_mfa.common.fit_cache import FitParameterCache
 
 
 class Extrapolation(RemindMFABaseModel):
@@ -29,8 +33,26 @@ class Extrapolation(RemindMFABaseModel):
     """Indizes for dimensions across which to regress independently. Other dimensions are regressed commonly."""
     prm_names: list[str] = []
     """Names of the parameters to be fitted. Set in subclasses."""
+    batched: bool = False
+    """Whether to fit all slices of independent_dims at once with a vectorized Levenberg-Marquardt solver instead of one least_squares call per slice."""
+    fit_cache: Optional[FitParameterCache] = None
+    """Persistent cache for fitted parameters. Defaults to None, i.e. no caching."""
+    n_workers: int = 1
+    """Number of worker processes over which the slices of independent_dims are distributed if no executor is given. Not used for batched regression."""
+    executor: Optional[Executor] = None
+    """Thread or process pool to distribute the slices of independent_dims over. Takes precedence over n_workers."""
+    chunks_per_worker: int = 4
+    """Number of chunks of slices per worker, trading off load balancing against pickling overhead."""
     _fit_prms: np.ndarray = PrivateAttr(default=None)
     """Optimized parameters after regression (set by calling regress())."""
+    _warm_start: Optional[np.ndarray] = PrivateAttr(default=None)
+    """Parameters of a previous fit of the same history to start iterative solvers from, if any."""
+    jacobian: ClassVar[Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]]] = None
+    """
+    Optional analytic derivative of `func` with respect to the parameters, with signature
+    (x, prms) and the shape of the `func` output plus a trailing parameter axis.
+    Can be set in subclasses as a staticmethod; otherwise, the Jacobian is estimated by finite differences.
+    """
 
     @model_validator(mode="after")
     def validate_data(self):
@@ -89,6 +111,52 @@ class Extrapolation(RemindMFABaseModel):
         """
         pass
 
+    @property
+    def has_jacobian(self) -> bool:
+        """Whether the subclass provides an analytic Jacobian."""
+        return self.jacobian is not None
+
+    @staticmethod
+    def stack_derivatives(x: np.ndarray, *derivatives: np.ndarray) -> np.ndarray:
+        """Broadcasts the derivatives by each parameter against x and stacks them along the last axis."""
+        shape = np.broadcast_shapes(x.shape, *[np.shape(d) for d in derivatives])
+        return np.stack([np.broadcast_to(d, shape) for d in derivatives], axis=-1)
+
+    def check_jacobian(
+        self, prms: Optional[np.ndarray] = None, rtol: float = 1.0e-5, atol: float = 1.0e-8
+    ) -> float:
+        """
+        Compares the analytic Jacobian with a central finite difference approximation on the
+        predictor values. Useful to validate new subclasses.
+        Raises a ValueError if they do not match and returns the maximum absolute deviation otherwise.
+
+        Args:
+            prms (np.ndarray, optional): Parameters at which to compare. Defaults to the initial guess.
+            rtol (float): Relative tolerance. Defaults to 1e-5.
+            atol (float): Absolute tolerance. Defaults to 1e-8.
+        """
+        if not self.has_jacobian:
+            raise NotImplementedError(f"{type(self).__name__} does not implement jacobian().")
+        x = self.predictor_values
+        if prms is None:
+            prms = self.initial_guess(x, self.data_to_extrapolate)
+        prms = np.asarray(prms, dtype=float)
+
+        analytic = self.jacobian(x, prms)
+        numerical = np.zeros_like(analytic)
+        for k in range(self.n_prms):
+            step = np.cbrt(np.finfo(float).eps) * max(1.0, abs(prms[k]))
+            prms_up, prms_down = prms.copy(), prms.copy()
+            prms_up[k] += step
+            prms_down[k] -= step
+            numerical[..., k] = (self.func(x, prms_up) - self.func(x, prms_down)) / (2 * step)
+
+        if not np.allclose(analytic, numerical, rtol=rtol, atol=atol):
+            raise ValueError(
+                f"Analytic Jacobian of {type(self).__name__} does not match finite differences."
+            )
+        return np.max(np.abs(analytic - numerical))
+
     @abstractmethod
     def initial_guess(
         self, predictor_values: np.ndarray, data_to_extrapolate: np.ndarray
@@ -110,11 +178,41 @@ class Extrapolation(RemindMFABaseModel):
 
         return fitting_function
 
+    def get_fitting_jacobian(
+        self,
+        predictor_values: np.ndarray,
+        weights: np.ndarray,
+    ) -> callable:
+
+        def fitting_jacobian(prms: np.ndarray) -> np.ndarray:
+            jac = weights[..., np.newaxis] * self.jacobian(predictor_values, prms)
+            return jac.reshape(-1, self.n_prms)
+
+        return fitting_jacobian
+
     def regress(self):
         """
         Fits the data to the predictor values using regression and returns the extrapolated values.
         The regression is performed independently for each dimension specified in `independent_dims`.
+        If a fit cache is given, iterative solvers start from the cached parameters of inputs
+        with the same history, which saves most of the iterations.
         """
+        if self.fit_cache is not None:
+            self._warm_start = self.fit_cache.load(self)
+
+        regression = self.regress_uncached()
+        if self.fit_cache is not None:
+            self.fit_cache.save(self)
+        return regression
+
+    def regress_uncached(self):
+        """Performs the actual fit, either batched or one slice of `independent_dims` at a time."""
+        if self.batched:
+            return self.regress_batched()
+        return self.regress_per_slice()
+
+    def regress_per_slice(self):
+        """Loops over the slices of `independent_dims` and fits each of them with least_squares."""
         # extract dimensions that are regressed independently
         predictor_shape = tuple(
             [self.predictor_values.shape[i] for i in sorted(self.independent_dims)]
@@ -123,7 +221,9 @@ class Extrapolation(RemindMFABaseModel):
         self._fit_prms = np.zeros(predictor_shape + (self.n_prms,))
         bounds_array = self.bound_list.to_np_array(self.prm_names)
 
-        # loop over dimensions that are regressed independently
+        # collect slices of dimensions that are regressed independently
+        slices = []
+        slice_args = []
         for slice_indep in np.ndindex(predictor_shape):
 
             slice_all = [slice(None)] * len(self.predictor_values.shape)
@@ -131,31 +231,229 @@ class Extrapolation(RemindMFABaseModel):
                 slice_all[j] = slice_indep[i]
             slice_all = tuple(slice_all)
 
-            self._fit_prms[slice_indep], regression[slice_all] = self.regress_common(
-                self.predictor_values[slice_all],
-                self.data_to_extrapolate[slice_all],
-                self.weights[slice_all],
-                bounds_array[slice_indep] if bounds_array is not None else (-np.inf, np.inf),
+            slices.append((slice_indep, slice_all))
+            slice_args.append(
+                (
+                    self.predictor_values[slice_all],
+                    self.data_to_extrapolate[slice_all],
+                    self.weights[slice_all],
+                    bounds_array[slice_indep] if bounds_array is not None else (-np.inf, np.inf),
+                    self._warm_start[slice_indep] if self._warm_start is not None else None,
+                )
             )
 
+        results = self.map_slices(slice_args)
+        for (slice_indep, slice_all), (fit_prms, slice_regression) in zip(slices, results):
+            self._fit_prms[slice_indep], regression[slice_all] = fit_prms, slice_regression
+
         return regression
 
-    def regress_common(self, predictor, data, weights, bounds):
+    def map_slices(self, slice_args: list[tuple]) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Calls `regress_common` for the arguments of each slice.
+        If an executor or more than one worker is given, chunks of slices are distributed over a
+        pool. The results are returned in the order of the input, so they are the same as in serial.
+        """
+        if self.executor is None and self.n_workers <= 1:
+            return [self.regress_common(*args) for args in slice_args]
+
+        if self.executor is None:
+            n_workers = self.n_workers
+        else:
+            n_workers = getattr(self.executor, "_max_workers", os.cpu_count())
+        n_chunks = min(len(slice_args), self.chunks_per_worker * max(n_workers, 1))
+        chunks = [list(c) for c in np.array_split(np.arange(len(slice_args)), n_chunks)]
+        chunk_args = [[slice_args[i] for i in chunk] for chunk in chunks]
+        executor = self.executor if self.executor is not None else get_pool(self.n_workers)
+        chunk_results = executor.map(regress_slices, [self.slice_solver()] * n_chunks, chunk_args)
+        return [result for chunk in chunk_results for result in chunk]
+
+    def slice_solver(self) -> "Extrapolation":
+        """
+        Copy of the extrapolation that can fit single slices in worker processes.
+        The full data arrays are replaced by empty ones, since the slices are passed separately,
+        only keeping the number of historic time steps.
+        """
+        solver = self.model_copy(
+            update={
+                "data_to_extrapolate": np.empty((self.n_historic, 0)),
+                "predictor_values": np.empty((self.predictor_values.shape[0], 0)),
+                "weights": None,
+                "bound_list": BoundList(),
+                "fit_cache": None,
+                "executor": None,
+                "n_workers": 1,
+            }
+        )
+        solver._fit_prms = None
+        solver._warm_start = None
+        return solver
+
+    def regress_common(self, predictor, data, weights, bounds, x0=None):
         """
         Finds optimal fit of data through least squares. Weights and bounds are applied.
+        Starts from x0 if given, otherwise from the initial guess.
         """
         fitting_function = self.get_fitting_function(
             predictor[: self.n_historic, ...],
             data,
             weights,
         )
-        initial_guess = self.initial_guess(predictor, data)
+        if self.has_jacobian:
+            jac = self.get_fitting_jacobian(predictor[: self.n_historic, ...], weights)
+        else:
+            jac = "2-point"
+        initial_guess = self.initial_guess(predictor, data) if x0 is None else x0
         # correct initial guess
         initial_guess = self.correct_initial_guess_with_bounds(initial_guess, bounds)
-        fit_prms = least_squares(fitting_function, x0=initial_guess, gtol=1.0e-12, bounds=bounds).x
+        fit_prms = least_squares(
+            fitting_function, x0=initial_guess, jac=jac, gtol=1.0e-12, bounds=bounds
+        ).x
         regression = self.func(predictor, fit_prms)
         return fit_prms, regression
 
+    def regress_batched(self):
+        """
+        Same as `regress`, but fits all slices of `independent_dims` in one vectorized
+        Levenberg-Marquardt iteration instead of looping over them.
+        """
+        indep_axes = tuple(sorted(self.independent_dims))
+        predictor_shape = tuple([self.predictor_values.shape[i] for i in indep_axes])
+        predictor = self.to_slice_major(self.predictor_values)
+        data = self.to_slice_major(self.data_to_extrapolate)
+        weights = self.to_slice_major(self.weights)
+
+        bounds_array = self.bound_list.to_np_array(self.prm_names)
+        if bounds_array is None:
+            bounds_array = np.stack(
+                (np.full(self.n_prms, -np.inf), np.full(self.n_prms, np.inf)), axis=0
+            )
+            bounds_array = np.broadcast_to(bounds_array, predictor_shape + bounds_array.shape)
+        bounds_array = bounds_array.reshape((-1, 2, self.n_prms))
+
+        x0 = None if self._warm_start is None else self._warm_start.reshape(-1, self.n_prms)
+        fit_prms = self.least_squares_batched(predictor, data, weights, bounds_array, x0=x0)
+        regression = self.func(predictor, self.batched_prms(fit_prms, predictor.ndim))
+
+        self._fit_prms = fit_prms.reshape(predictor_shape + (self.n_prms,))
+        return self.from_slice_major(regression, self.predictor_values.shape)
+
+    def to_slice_major(self, array: np.ndarray) -> np.ndarray:
+        """Moves the independent dimensions to the front and flattens them into one slice axis."""
+        indep_axes = sorted(self.independent_dims)
+        array = np.moveaxis(array, indep_axes, range(len(indep_axes)))
+        return array.reshape((-1,) + array.shape[len(indep_axes) :])
+
+    def from_slice_major(self, array: np.ndarray, shape: tuple) -> np.ndarray:
+        """Inverse of `to_slice_major`."""
+        indep_axes = sorted(self.independent_dims)
+        moved_shape = tuple(shape[i] for i in indep_axes) + tuple(
+            n for i, n in enumerate(shape) if i not in indep_axes
+        )
+        array = array.reshape(moved_shape)
+        return np.moveaxis(array, range(len(indep_axes)), indep_axes)
+
+    @staticmethod
+    def batched_prms(prms: np.ndarray, ndim: int) -> np.ndarray:
+        """
+        Transforms parameters of shape (n_slices, n_prms) such that prms[i] broadcasts against
+        slice-major predictor values of dimensionality ndim, as expected by `func`.
+        """
+        return prms.T.reshape(prms.shape[::-1] + (1,) * (ndim - 1))
+
+    def least_squares_batched(
+        self,
+        predictor: np.ndarray,
+        data: np.ndarray,
+        weights: np.ndarray,
+        bounds: np.ndarray,
+        x0: Optional[np.ndarray] = None,
+        ftol: float = 1.0e-10,
+        xtol: float = 1.0e-10,
+        gtol: float = 1.0e-12,
+        max_iter: int = 500,
+    ) -> np.ndarray:
+        """
+        Vectorized Levenberg-Marquardt solver with projected bounds.
+        All arrays are slice-major, i.e. their first axis enumerates the independent fits.
+        Parameters at an active bound are frozen for the step computation, and steps are
+        clipped to the bounds. Starts from x0 with shape (n_slices, n_prms) if given,
+        otherwise from the initial guesses. Returns the fitted parameters with the same shape.
+        """
+        n_slices = data.shape[0]
+        x_historic = predictor[:, : self.n_historic, ...]
+        lower, upper = bounds[:, 0, :], bounds[:, 1, :]
+
+        prms = np.zeros((n_slices, self.n_prms))
+        for i in range(n_slices):
+            initial_guess = self.initial_guess(predictor[i], data[i]) if x0 is None else x0[i]
+            prms[i] = self.correct_initial_guess_with_bounds(initial_guess, (lower[i], upper[i]))
+        prms = np.clip(prms, lower, upper)
+
+        def residuals(prms):
+            f = self.func(x_historic, self.batched_prms(prms, x_historic.ndim))
+            return (weights * (f - data)).reshape(n_slices, -1)
+
+        def jacobian(prms, res):
+            if self.has_jacobian:
+                batched_prms = self.batched_prms(prms, x_historic.ndim)
+                jac = weights[..., np.newaxis] * self.jacobian(x_historic, batched_prms)
+                return jac.reshape(n_slices, -1, self.n_prms)
+            jac = np.zeros(res.shape + (self.n_prms,))
+            for k in range(self.n_prms):
+                step = np.sqrt(np.finfo(float).eps) * np.maximum(1.0, np.abs(prms[:, k]))
+                step = np.where(prms[:, k] + step > upper[:, k], -step, step)
+                prms_step = prms.copy()
+                prms_step[:, k] += step
+                jac[..., k] = (residuals(prms_step) - res) / step[:, None]
+            return jac
+
+        res = residuals(prms)
+        cost = 0.5 * np.sum(res**2, axis=1)
+        damping = np.full(n_slices, 1.0e-3)
+        active = cost > 0.0
+        identity = np.eye(self.n_prms)
+
+        for _ in range(max_iter):
+            if not np.any(active):
+                break
+            jac = jacobian(prms, res)
+            jtj = np.einsum("snp,snq->spq", jac, jac)
+            grad = np.einsum("snp,sn->sp", jac, res)
+
+            # freeze parameters at a bound if the descent direction points outwards
+            free = ~(((prms <= lower) & (grad > 0)) | ((prms >= upper) & (grad < 0)))
+            free_grad = np.where(free, grad, 0.0)
+
+            scale = np.diagonal(jtj, axis1=1, axis2=2).copy()
+            scale = np.where(scale > 0.0, scale, 1.0)
+            system = jtj + damping[:, None, None] * scale[:, :, None] * identity
+            free_pairs = free[:, :, None] & free[:, None, :]
+            system = np.where(free_pairs, system, 0.0) + (~free)[:, :, None] * identity
+            step = np.linalg.solve(system, -free_grad[..., None])[..., 0]
+
+            prms_new = np.clip(prms + step, lower, upper)
+            res_new = residuals(prms_new)
+            cost_new = 0.5 * np.sum(res_new**2, axis=1)
+            improved = active & (cost_new < cost)
+
+            step_taken = np.linalg.norm(prms_new - prms, axis=1)
+            converged = (
+                (improved & (cost - cost_new <= ftol * cost))
+                | (step_taken <= xtol * (xtol + np.linalg.norm(prms, axis=1)))
+                | (np.max(np.abs(free_grad), axis=1) <= gtol)
+                | (damping > 1.0e16)
+            )
+
+            prms = np.where(improved[:, None], prms_new, prms)
+            res = np.where(improved[:, None], res_new, res)
+            cost = np.where(improved, cost_new, cost)
+            damping = np.where(improved, damping / 3.0, damping * 10.0)
+            damping = np.clip(damping, 1.0e-12, 1.0e20)
+            active &= ~converged
+
+        return prms
+
     @staticmethod
     def correct_initial_guess_with_bounds(
         initial_guess: np.ndarray, bounds: Tuple[np.ndarray, np.ndarray]
@@ -177,7 +475,96 @@ class Extrapolation(RemindMFABaseModel):
         return initial_guess
 
 
-class ProportionalExtrapolation(Extrapolation):
+def regress_slices(extrapolation: Extrapolation, slice_args: list[tuple]) -> list[tuple]:
+    """Fits a chunk of slices. Module-level function such that it can be sent to worker processes."""
+    return [extrapolation.regress_common(*args) for args in slice_args]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+"""Worker pool shared by all extrapolations that are given n_workers > 1 and no executor."""
+
+
+def get_pool(n_workers: int) -> ProcessPoolExecutor:
+    """
+    Returns the shared worker pool, such that the workers are started only once per process
+    instead of once per fit. The pool is rebuilt if a different number of workers is requested.
+    """
+    global _pool
+    if _pool is None or _pool._max_workers != n_workers:
+        shutdown_pool()
+        _pool = ProcessPoolExecutor(max_workers=n_workers)
+    return _pool
+
+
+@atexit.register
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+class LinearExtrapolation(Extrapolation):
+    """
+    Base class for extrapolations that are linear in their parameters,
+    i.e. func(x, prms) = sum_i prms[i] * basis(x)[..., i].
+    These are solved in closed form by weighted linear least squares for all slices of
+    `independent_dims` at once instead of iteratively.
+    """
+
+    @staticmethod
+    @abstractmethod
+    def basis(x: np.ndarray) -> np.ndarray:
+        """
+        Basis functions evaluated at the predictor values.
+        Should be implemented in subclasses.
+
+        Args:
+            x (np.ndarray): Predictor values.
+        Returns:
+            np.ndarray: Basis function values with shape x.shape + (n_prms,).
+        """
+        pass
+
+    def regress_uncached(self):
+        """
+        Solves the weighted normal equations for all slices of `independent_dims` in one go.
+        Where the historic data does not determine all parameters, the solution closest to the
+        initial guess is used, as an iterative solver would. Bounds are applied by clipping.
+        """
+        indep_axes = tuple(sorted(self.independent_dims))
+        predictor_shape = tuple([self.predictor_values.shape[i] for i in indep_axes])
+        predictor = self.to_slice_major(self.predictor_values)
+        data = self.to_slice_major(self.data_to_extrapolate)
+        weights = self.to_slice_major(self.weights)
+        n_slices = data.shape[0]
+
+        basis = self.basis(predictor[:, : self.n_historic, ...]).reshape(n_slices, -1, self.n_prms)
+        squared_weights = (weights**2).reshape(n_slices, -1)
+        normal_matrix = np.einsum("snp,sn,snq->spq", basis, squared_weights, basis)
+        rhs = np.einsum("snp,sn,sn->sp", basis, squared_weights, data.reshape(n_slices, -1))
+
+        inverse = np.linalg.pinv(normal_matrix)
+        fit_prms = np.einsum("spq,sq->sp", inverse, rhs)
+
+        # add null space component from the initial guess for underdetermined slices
+        null_projector = np.eye(self.n_prms) - np.einsum("spq,sqr->spr", inverse, normal_matrix)
+        underdetermined = np.flatnonzero(np.any(np.abs(null_projector) > 1.0e-10, axis=(1, 2)))
+        for i in underdetermined:
+            initial_guess = self.initial_guess(predictor[i], data[i])
+            fit_prms[i] += null_projector[i] @ initial_guess
+
+        bounds_array = self.bound_list.to_np_array(self.prm_names)
+        if bounds_array is not None:
+            bounds_array = bounds_array.reshape((-1, 2, self.n_prms))
+            fit_prms = np.clip(fit_prms, bounds_array[:, 0, :], bounds_array[:, 1, :])
+
+        regression = self.func(predictor, self.batched_prms(fit_prms, predictor.ndim))
+        self._fit_prms = fit_prms.reshape(predictor_shape + (self.n_prms,))
+        return self.from_slice_major(regression, self.predictor_values.shape)
+
+
+class ProportionalExtrapolation(LinearExtrapolation):
 
     prm_names: list[str] = ["proportionality_factor"]
 
@@ -185,6 +572,14 @@ class ProportionalExtrapolation(Extrapolation):
     def func(x, prms):
         return prms[0] * x
 
+    @staticmethod
+    def basis(x):
+        return Extrapolation.stack_derivatives(x, x)
+
+    @staticmethod
+    def jacobian(x, prms):
+        return ProportionalExtrapolation.basis(x)
+
     def initial_guess(self, predictor_values, data_to_extrapolate):
         return np.array([1.0])
 
@@ -197,6 +592,12 @@ class PehlExtrapolation(Extrapolation):
     def func(x, prms):
         return prms[0] / (1.0 + np.exp(prms[1] / x))
 
+    @staticmethod
+    def jacobian(x, prms):
+        share = 1.0 / (1.0 + np.exp(prms[1] / x))
+        d_stretch = -prms[0] * share * (1.0 - share) / x
+        return Extrapolation.stack_derivatives(x, share, d_stretch)
+
     def initial_guess(self, predictor_values, data_to_extrapolate):
         return np.array(
             [
@@ -214,6 +615,11 @@ class ExponentialSaturationExtrapolation(Extrapolation):
     def func(x, prms):
         return prms[0] * (1 - np.exp(-prms[1] * x))
 
+    @staticmethod
+    def jacobian(x, prms):
+        decay = np.exp(-prms[1] * x)
+        return Extrapolation.stack_derivatives(x, 1 - decay, prms[0] * x * decay)
+
     def initial_guess(self, predictor_values, data_to_extrapolate):
         current_level = np.max(data_to_extrapolate[-1, ...])
         current_extrapolator = np.max(predictor_values[self.n_historic - 1, ...])
@@ -232,6 +638,12 @@ class LogisticExtrapolation(Extrapolation):
     def func(x, prms):
         return prms[0] / (1.0 + np.exp(-prms[1] * (x - prms[2])))
 
+    @staticmethod
+    def jacobian(x, prms):
+        share = 1.0 / (1.0 + np.exp(-prms[1] * (x - prms[2])))
+        slope = prms[0] * share * (1.0 - share)
+        return Extrapolation.stack_derivatives(x, share, slope * (x - prms[2]), -slope * prms[1])
+
     def initial_guess(self, predictor_values, data_to_extrapolate):
         max_level = np.max(data_to_extrapolate)
         sat_level_guess = 2 * max_level
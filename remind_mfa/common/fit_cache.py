@@ -0,0 +1,76 @@
+import os
+import hashlib
+import functools
+import numpy as np
+from typing import Optional, TYPE_CHECKING
+
+from remind_mfa.common.helpers import RemindMFABaseModel
+
+if TYPE_CHECKING:
+    from remind_mfa.common.data_extrapolations import Extrapolation
+
+
+class FitParameterCache(RemindMFABaseModel):
+    """
+    Persistent cache for fitted extrapolation parameters.
+    Entries are keyed by a hash of the extrapolation class, the historic data, the historic part of
+    the predictor, weights, bounds and independent dims. Future predictor values are not part of
+    the key, such that runs which only differ in the future share entries. Since initial guesses
+    may depend on future predictor values, cached parameters are used as the starting point of
+    the fit instead of skipping it.
+    """
+
+    path: str
+    """Directory in which the cached parameters are stored as .npz files."""
+
+    def key(self, extrapolation: "Extrapolation") -> str:
+        """Hash of all inputs that determine the fitted parameters, except future predictor values."""
+        n_historic = extrapolation.n_historic
+        bounds = extrapolation.bound_list.to_np_array(extrapolation.prm_names)
+        hash_inputs = [
+            type(extrapolation).__name__,
+            extrapolation.prm_names,
+            sorted(extrapolation.independent_dims),
+            extrapolation.batched,
+            extrapolation.data_to_extrapolate,
+            extrapolation.predictor_values[:n_historic, ...],
+            extrapolation.weights,
+            bounds,
+        ]
+        sha = hashlib.sha256()
+        for item in hash_inputs:
+            if isinstance(item, np.ndarray):
+                item = np.ascontiguousarray(item, dtype=np.float64)
+                sha.update(str(item.shape).encode())
+                sha.update(item.tobytes())
+            else:
+                sha.update(repr(item).encode())
+        return sha.hexdigest()
+
+    def filename(self, extrapolation: "Extrapolation") -> str:
+        name = f"{type(extrapolation).__name__}_{self.key(extrapolation)}.npz"
+        return os.path.join(self.path, name)
+
+    def load(self, extrapolation: "Extrapolation") -> Optional[np.ndarray]:
+        """Returns the cached fit parameters for the extrapolation, or None if there are none."""
+        filename = self.filename(extrapolation)
+        if not os.path.exists(filename):
+            return None
+        with np.load(filename) as data:
+            return data["fit_prms"]
+
+    def save(self, extrapolation: "Extrapolation"):
+        """Stores the fit parameters of a regressed extrapolation."""
+        os.makedirs(self.path, exist_ok=True)
+        filename = self.filename(extrapolation)
+        # write to temporary file first, such that parallel runs never read incomplete files
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "wb") as f:
+            np.savez(f, fit_prms=extrapolation.fit_prms)
+        os.replace(tmp_filename, filename)
+
+
+@functools.lru_cache
+def get_fit_cache(path: str) -> FitParameterCache:
+    """Returns one cache object per directory, such that it is not re-created for every fit."""
+    return FitParameterCache(path=path)
@@ -1,3 +1,4 @@
+import importlib
 from enum import Enum
 from pydantic import BaseModel, ConfigDict
 
@@ -8,6 +9,12 @@ class ModelNames(str, Enum):
     CEMENT = "cement"
 
 
+def get_model_class(model: ModelNames) -> type:
+    """Imports only the module of the given model, since importing all models is slow."""
+    module = importlib.import_module(f"remind_mfa.{model.value}.{model.value}_model")
+    return getattr(module, f"{model.value.capitalize()}Model")
+
+
 def prefix_from_module(module: str) -> str:
     if len(module) < 2:
         raise ValueError("Module name must be at least 2 characters long")
@@ -35,3 +42,10 @@ class RegressOverModes(str, Enum):
     GDPPC = "gdppc"
     LOGGDPPC = "loggdppc"
     LOCGDPPC_TIME_WEIGHTED_SUM = "loggdppc_time_weighted_sum"
+
+
+class DistributionTypes(str, Enum):
+    NORMAL = "normal"
+    LOGNORMAL = "lognormal"
+    UNIFORM = "uniform"
+    TRIANGULAR = "triangular"
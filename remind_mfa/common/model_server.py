@@ -0,0 +1,241 @@
+import io
+import json
+import logging
+import threading
+import urllib.error
+import urllib.request
+import urllib.parse
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Union, TYPE_CHECKING
+import numpy as np
+import flodym as fd
+
+from remind_mfa.common.common_data_reader import LazyParameterDict
+
+if TYPE_CHECKING:
+    from remind_mfa.common.common_model import CommonModel
+
+
+def arrays_to_bytes(arrays: dict[str, np.ndarray]) -> bytes:
+    """Serializes named arrays in the uncompressed .npz format."""
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def arrays_from_bytes(data: bytes) -> dict[str, np.ndarray]:
+    with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+        return {name: npz[name] for name in npz.files}
+
+
+class ModelServer:
+    """
+    Keeps a model in memory after the scenario-independent computations, such that coupled runs
+    only pay for the future MFA in each iteration.
+    Each request starts from the same baseline parameters, replaces the updated ones and
+    re-runs the future MFA. The stock projection is only re-computed if one of the
+    `stock_projection_parameters` of the model is updated.
+    The historic MFA is never re-computed, so updates of historic values only affect the future.
+    The future MFA is run once with the baseline parameters on construction, such that all
+    code paths are warm for the first request. The parameters read in this run and those of the
+    stock projection are the ones that can be updated. Updates of other parameters, e.g. those
+    only used by the historic MFA or in modify_parameters, are rejected, since they would have
+    no effect.
+    """
+
+    def __init__(self, model: "CommonModel"):
+        self.model = model
+        if not hasattr(model, "historic_mfa"):
+            model.run_historic()
+        self.baseline_parameters = model.parameters.copy()
+        self.baseline_stock_projection = model.stock_projection
+        self.updatable_parameters = set(model.stock_projection_parameters)
+        self.updatable_parameters |= self.read_by_future_mfa()
+
+    def read_by_future_mfa(self) -> set[str]:
+        """Runs the future MFA with the baseline parameters and returns the names of those read."""
+        model = self.model
+        parameters = self.recording_copy(self.baseline_parameters)
+        model.parameters = parameters
+        model.stock_projection = self.baseline_stock_projection
+        model.run_future()
+        return parameters.accessed
+
+    def recording_copy(
+        self, parameters: Union[LazyParameterDict, dict[str, fd.Parameter]]
+    ) -> LazyParameterDict:
+        """Copy of the parameters with an empty record of the accessed ones."""
+        if isinstance(parameters, LazyParameterDict):
+            return LazyParameterDict(
+                reader=parameters.reader,
+                parameter_definitions=list(parameters.definitions.values()),
+                dims=parameters.dims,
+                loaded=parameters.loaded.copy(),
+            )
+        return LazyParameterDict(
+            reader=None, parameter_definitions=[], dims=self.model.dims, loaded=dict(parameters)
+        )
+
+    def info(self) -> dict:
+        """Dimensions, parameters and outputs of the model, for clients to build requests."""
+        model = self.model
+        return {
+            "model": model.cfg.model.value,
+            "dims": {
+                dim.letter: {"name": dim.name, "items": [str(i) for i in dim.items]}
+                for dim in model.dims
+            },
+            "parameters": {
+                p.name: list(self.baseline_parameters[p.name].dims.letters)
+                for p in model.definition_future.parameters
+                if p.name in self.updatable_parameters
+            },
+            "outputs": self.output_names(),
+        }
+
+    def output_names(self) -> list[str]:
+        mfa = self.model.future_mfa
+        return [f"flows/{name}" for name in mfa.flows] + [f"stocks/{name}" for name in mfa.stocks]
+
+    def compute(
+        self, updates: dict[str, np.ndarray], outputs: Optional[list[str]] = None
+    ) -> dict[str, np.ndarray]:
+        """
+        Re-runs the future MFA with updated parameter values and returns the requested outputs.
+
+        Args:
+            updates: Parameter values by name, with the full shape of the parameter dimensions.
+            outputs: Names of the form 'flows/<flow name>' or 'stocks/<stock name>'.
+                If None, all flows and stocks are returned.
+        """
+        model = self.model
+        parameters = self.baseline_parameters.copy()
+        for name, values in updates.items():
+            if name not in parameters:
+                raise KeyError(f"Unknown parameter '{name}'.")
+            if name not in self.updatable_parameters:
+                raise ValueError(
+                    f"Parameter '{name}' is used neither by the stock projection nor by the future "
+                    "MFA, so it cannot be updated."
+                )
+            dims = parameters[name].dims
+            values = np.asarray(values, dtype=float)
+            if values.shape != dims.shape:
+                raise ValueError(
+                    f"Parameter '{name}' must have shape {dims.shape} (dims {dims.letters}), "
+                    f"but has shape {values.shape}."
+                )
+            parameters[name] = fd.Parameter(dims=dims, values=values.copy(), name=name)
+        model.parameters = parameters
+
+        if any(name in self.model.stock_projection_parameters for name in updates):
+            with model.profiler.stage("get_long_term_stock"):
+                model.stock_projection = model.get_long_term_stock()
+        else:
+            model.stock_projection = self.baseline_stock_projection
+        model.run_future()
+
+        if outputs is None:
+            outputs = self.output_names()
+        return {name: self.get_output(name) for name in outputs}
+
+    def get_output(self, name: str) -> np.ndarray:
+        kind, _, entity = name.partition("/")
+        mfa = self.model.future_mfa
+        if kind == "flows" and entity in mfa.flows:
+            return mfa.flows[entity].values
+        if kind == "stocks" and entity in mfa.stocks:
+            return mfa.stocks[entity].stock.values
+        raise KeyError(f"Unknown output '{name}'. Must be 'flows/<name>' or 'stocks/<name>'.")
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        """
+        Serves the model over HTTP until a shutdown request is received. Requests are processed
+        one at a time. Endpoints:
+            GET /info: JSON description of dimensions, parameters and outputs.
+            POST /compute[?outputs=name1,name2]: .npz body of updated parameters,
+                returns the outputs as .npz.
+            POST /shutdown: stops the server.
+        """
+        http_server = HTTPServer((host, port), _make_handler(self))
+        logging.info(f"Serving {type(self.model).__name__} on http://{host}:{port}")
+        with http_server:
+            http_server.serve_forever()
+
+
+def _make_handler(server: ModelServer) -> type[BaseHTTPRequestHandler]:
+
+    class ModelRequestHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path == "/info":
+                self.respond(200, json.dumps(server.info()).encode(), "application/json")
+            else:
+                self.respond_error(404, f"Unknown path {self.path}")
+
+        def do_POST(self):
+            url = urllib.parse.urlparse(self.path)
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if url.path == "/shutdown":
+                self.respond(200, b"", "text/plain")
+                # shutdown waits for serve_forever to return, so it must run in another thread
+                threading.Thread(target=self.server.shutdown).start()
+            elif url.path == "/compute":
+                query = urllib.parse.parse_qs(url.query)
+                outputs = query["outputs"][0].split(",") if "outputs" in query else None
+                try:
+                    results = server.compute(arrays_from_bytes(body), outputs=outputs)
+                except (KeyError, ValueError) as e:
+                    self.respond_error(400, str(e))
+                    return
+                except Exception as e:
+                    logging.exception("Computation failed.")
+                    self.respond_error(500, f"{type(e).__name__}: {e}")
+                    return
+                self.respond(200, arrays_to_bytes(results), "application/octet-stream")
+            else:
+                self.respond_error(404, f"Unknown path {self.path}")
+
+        def respond(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def respond_error(self, status: int, message: str):
+            self.respond(status, json.dumps({"error": message}).encode(), "application/json")
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+    return ModelRequestHandler
+
+
+class ModelClient:
+    """Minimal client for a ModelServer, e.g. for testing the coupling locally."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, timeout: float = 600.0):
+        self.url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def info(self) -> dict:
+        with urllib.request.urlopen(f"{self.url}/info", timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def compute(
+        self, updates: dict[str, np.ndarray], outputs: Optional[list[str]] = None
+    ) -> dict[str, np.ndarray]:
+        url = f"{self.url}/compute"
+        if outputs is not None:
+            url += "?" + urllib.parse.urlencode({"outputs": ",".join(outputs)})
+        request = urllib.request.Request(url, data=arrays_to_bytes(updates), method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return arrays_from_bytes(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(json.loads(e.read())["error"]) from e
+
+    def shutdown(self):
+        request = urllib.request.Request(f"{self.url}/shutdown", data=b"", method="POST")
+        urllib.request.urlopen(request, timeout=self.timeout).close()
@@ -0,0 +1,421 @@
+import logging
+from copy import copy
+from typing import Optional, TYPE_CHECKING
+import numpy as np
+import flodym as fd
+
+from remind_mfa.common.common_config import ParameterDistribution
+from remind_mfa.common.common_definition import RemindMFADefinition
+from remind_mfa.common.helpers import DistributionTypes
+
+if TYPE_CHECKING:
+    from remind_mfa.common.common_model import CommonModel
+
+SAMPLE_DIM_LETTER = "n"
+"""Letter of the sample dimension, which is appended to sampled parameters, flows and stocks."""
+
+
+def sample_letters(dims: fd.DimensionSet) -> tuple[str, ...]:
+    """
+    Letter of the sample dimension if the model is run vectorized over Monte Carlo samples,
+    otherwise empty. To be appended to dimension letters of arrays that must keep samples apart.
+    """
+    return (SAMPLE_DIM_LETTER,) if SAMPLE_DIM_LETTER in dims.letters else ()
+
+
+def draw_factors(
+    distribution: ParameterDistribution,
+    shape: tuple[int, ...],
+    n_samples: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Random factors the parameter values are multiplied with, with the samples as last axis.
+    All distributions have a mean of one. Samples are drawn sample by sample, such that
+    consecutive calls continue the same random sequence regardless of the number of samples.
+    """
+    size = (n_samples,) if distribution.correlated else (n_samples, *shape)
+    spread = distribution.relative_spread
+    if distribution.distribution == DistributionTypes.NORMAL:
+        factors = 1.0 + spread * rng.standard_normal(size)
+    elif distribution.distribution == DistributionTypes.LOGNORMAL:
+        sigma = np.sqrt(np.log1p(spread**2))
+        factors = np.exp(sigma * rng.standard_normal(size) - 0.5 * sigma**2)
+    elif distribution.distribution == DistributionTypes.UNIFORM:
+        factors = 1.0 + spread * rng.uniform(-1.0, 1.0, size)
+    elif distribution.distribution == DistributionTypes.TRIANGULAR:
+        factors = 1.0 + spread * rng.triangular(-1.0, 0.0, 1.0, size)
+    else:
+        raise ValueError(f"Unknown distribution: {distribution.distribution}")
+    return np.moveaxis(factors, 0, -1)
+
+
+def sample_parameter(
+    parameter: fd.Parameter,
+    distribution: ParameterDistribution,
+    sample_dim: fd.Dimension,
+    rng: np.random.Generator,
+) -> fd.Parameter:
+    """Returns the parameter with the sample dimension appended, drawn around its values."""
+    factors = draw_factors(distribution, parameter.dims.shape, sample_dim.len, rng)
+    values = parameter.values[..., np.newaxis] * factors
+    if distribution.lower_bound is not None or distribution.upper_bound is not None:
+        values = np.clip(values, distribution.lower_bound, distribution.upper_bound)
+    return fd.Parameter(
+        dims=parameter.dims.expand_by([sample_dim]), values=values, name=parameter.name
+    )
+
+
+def broadcast_to_samples(parameter: fd.Parameter, sample_dim: fd.Dimension) -> fd.Parameter:
+    """Parameter with the sample dimension appended, as a read-only view of the original values."""
+    dims = parameter.dims.expand_by([sample_dim])
+    values = np.broadcast_to(parameter.values[..., np.newaxis], dims.shape)
+    return fd.Parameter(dims=dims, values=values, name=parameter.name)
+
+
+def add_sample_dimension(definition: RemindMFADefinition, letter: str) -> RemindMFADefinition:
+    """Copy of the definition with the sample dimension appended to all flows, stocks and trades."""
+
+    def expand(definitions: list) -> list:
+        return [
+            d.model_copy(update={"dim_letters": d.dim_letters + (letter,)}) for d in definitions
+        ]
+
+    return definition.model_copy(
+        update={
+            "flows": expand(definition.flows),
+            "stocks": expand(definition.stocks),
+            "trades": expand(definition.trades),
+        }
+    )
+
+
+class StreamingQuantiles:
+    """
+    Estimates quantiles of a stream of arrays entry by entry with the P² algorithm
+    (Jain and Chlamtac, 1985), which keeps five markers per quantile instead of all values.
+    Each update is vectorized over all entries and quantiles.
+    The markers are initialized from the sorted values of the first batch (or batches, until
+    there are at least five values), which improves the estimate for small sample sizes.
+    """
+
+    def __init__(self, quantiles: list[float]):
+        p = np.asarray(quantiles, dtype=float)[:, np.newaxis]
+        self.quantiles = p[:, 0]
+        self.count = 0
+        self._first_values: list[np.ndarray] = []
+        self._desired_fractions = np.hstack([0 * p, p / 2, p, (1 + p) / 2, 1 + 0 * p])
+        """Desired marker positions relative to the number of values, with shape (quantile, marker)."""
+        self._heights = None
+        """Marker heights with shape (quantile, marker, *entries)."""
+        self._positions = None
+        """Marker positions (one-based ranks) with shape (quantile, marker, *entries)."""
+
+    def update(self, values: np.ndarray):
+        """Adds a batch of values, with the samples as last axis."""
+        if self._heights is None:
+            self._first_values.extend(np.moveaxis(np.asarray(values, dtype=float), -1, 0))
+            self.count += values.shape[-1]
+            if self.count >= 5:
+                self._initialize_markers()
+            return
+        for i in range(values.shape[-1]):
+            self._add(values[..., i])
+
+    def _initialize_markers(self):
+        first_values = np.sort(np.stack(self._first_values), axis=0)
+        n_values = len(first_values)
+        ranks = np.rint(1 + (n_values - 1) * self._desired_fractions).astype(int)
+        # markers must have distinct ranks
+        for i in range(1, 4):
+            ranks[:, i] = np.clip(ranks[:, i], ranks[:, i - 1] + 1, n_values - 4 + i)
+        self._heights = first_values[ranks - 1]
+        ranks = ranks.reshape(ranks.shape + (1,) * (first_values.ndim - 1)).astype(float)
+        self._positions = np.broadcast_to(ranks, self._heights.shape).copy()
+        self._first_values = []
+
+    def _add(self, x: np.ndarray):
+        self.count += 1
+        q, n = self._heights, self._positions
+        # markers above x move up by one position; the outer markers are extended to x
+        n[:, 1:4] += x < q[:, 1:4]
+        n[:, 4] += 1
+        q[:, 0] = np.minimum(q[:, 0], x)
+        q[:, 4] = np.maximum(q[:, 4], x)
+
+        desired = 1 + (self.count - 1) * self._desired_fractions
+        desired = desired.reshape(desired.shape + (1,) * (q.ndim - 2))
+        for i in range(1, 4):
+            d = desired[:, i] - n[:, i]
+            move = ((d >= 1) & (n[:, i + 1] - n[:, i] > 1)) | (
+                (d <= -1) & (n[:, i - 1] - n[:, i] < -1)
+            )
+            if not move.any():
+                continue
+            s = np.where(move, np.sign(d), 0.0)
+            parabolic = q[:, i] + s / (n[:, i + 1] - n[:, i - 1]) * (
+                (n[:, i] - n[:, i - 1] + s) * (q[:, i + 1] - q[:, i]) / (n[:, i + 1] - n[:, i])
+                + (n[:, i + 1] - n[:, i] - s) * (q[:, i] - q[:, i - 1]) / (n[:, i] - n[:, i - 1])
+            )
+            q_neighbor = np.where(s > 0, q[:, i + 1], q[:, i - 1])
+            n_neighbor = np.where(s > 0, n[:, i + 1], n[:, i - 1])
+            linear = q[:, i] + s * (q_neighbor - q[:, i]) / (n_neighbor - n[:, i])
+            is_monotonic = (q[:, i - 1] < parabolic) & (parabolic < q[:, i + 1])
+            q[:, i] = np.where(move, np.where(is_monotonic, parabolic, linear), q[:, i])
+            n[:, i] += s
+
+    @property
+    def values(self) -> np.ndarray:
+        """Estimated quantiles with shape (quantile, *entries)."""
+        if self._heights is None:
+            return np.quantile(np.stack(self._first_values), self.quantiles, axis=0)
+        return self._heights[:, 2].copy()
+
+
+class StreamingSummary:
+    """
+    Mean, standard deviation and quantiles of a stream of arrays, computed without storing them.
+    Mean and standard deviation are exact. They are merged batch by batch as in Chan et al. (1979).
+    """
+
+    def __init__(self, quantiles: list[float]):
+        self.quantile_estimator = StreamingQuantiles(quantiles)
+        self.count = 0
+        self.mean = None
+        self._sum_of_squares = None
+
+    def update(self, values: np.ndarray):
+        """Adds a batch of values, with the samples as last axis."""
+        n_batch = values.shape[-1]
+        batch_mean = values.mean(axis=-1)
+        batch_sum_of_squares = ((values - batch_mean[..., np.newaxis]) ** 2).sum(axis=-1)
+        if self.mean is None:
+            self.mean = batch_mean
+            self._sum_of_squares = batch_sum_of_squares
+        else:
+            n_total = self.count + n_batch
+            delta = batch_mean - self.mean
+            self.mean = self.mean + delta * n_batch / n_total
+            self._sum_of_squares = (
+                self._sum_of_squares
+                + batch_sum_of_squares
+                + delta**2 * self.count * n_batch / n_total
+            )
+        self.count += n_batch
+        self.quantile_estimator.update(values)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self._sum_of_squares / max(self.count - 1, 1))
+
+    @property
+    def statistic_names(self) -> list[str]:
+        return ["mean", "std"] + [f"q{q:g}" for q in self.quantile_estimator.quantiles]
+
+    def to_flodym(self, dims: fd.DimensionSet, name: str) -> fd.FlodymArray:
+        """Summary as an array with an additional 'Statistic' dimension as last axis."""
+        statistic_dim = fd.Dimension(name="Statistic", letter="q", items=self.statistic_names)
+        values = np.concatenate(
+            [self.mean[np.newaxis], self.std[np.newaxis], self.quantile_estimator.values]
+        )
+        return fd.FlodymArray(
+            dims=dims.expand_by([statistic_dim]), values=np.moveaxis(values, 0, -1), name=name
+        )
+
+
+class MonteCarloEngine:
+    """
+    Propagates the uncertainty of parameters through the model by Monte Carlo sampling.
+    The samples of the configured parameters are drawn in chunks. Each chunk is computed in
+    batches, each as one model run, in which a sample dimension is appended to the sampled
+    parameters and to all flows, stocks and trades. Since not all computations of a model
+    broadcast over an additional dimension, the first vectorized run is checked against a run of
+    its first sample alone. If they differ or the vectorized run fails, e.g. for lack of memory,
+    the batch size is halved for this and all further batches, down to single samples.
+    Mean, standard deviation and quantiles of all flows and stocks of the future MFA are updated
+    after each chunk, such that the samples need not be stored.
+    Each sample re-runs the historic MFA and the stock projection, since they may depend on the
+    sampled parameters.
+    """
+
+    def __init__(self, model: "CommonModel"):
+        self.model = model
+        self.cfg = model.cfg.monte_carlo
+        self.parameters = model.parameters.copy()
+        unknown = [name for name in self.cfg.parameters if name not in self.parameters]
+        if unknown:
+            raise ValueError(f"Monte Carlo parameters not found in model parameters: {unknown}")
+        seeds = np.random.SeedSequence(self.cfg.seed).spawn(len(self.cfg.parameters))
+        self.rngs = {
+            name: np.random.default_rng(seed) for name, seed in zip(self.cfg.parameters, seeds)
+        }
+        self.batch_size = self.cfg.chunk_size if self.cfg.vectorize else 1
+        """Number of samples per model run, reduced if vectorized runs fail."""
+        self.vectorization_checked = False
+        self.summaries: dict[str, StreamingSummary] = {}
+        self.output_dims: dict[str, fd.DimensionSet] = {}
+
+    def run(self) -> dict[str, fd.FlodymArray]:
+        """
+        Returns the summary statistics of all flows and stocks, by names of the form
+        'flows/<flow name>' and 'stocks/<stock name>'.
+        """
+        for start in range(0, self.cfg.n_samples, self.cfg.chunk_size):
+            stop = min(start + self.cfg.chunk_size, self.cfg.n_samples)
+            sample_dim = fd.Dimension(
+                name="Sample", letter=SAMPLE_DIM_LETTER, items=list(range(start, stop))
+            )
+            samples = {
+                name: sample_parameter(
+                    self.parameters[name], distribution, sample_dim, self.rngs[name]
+                )
+                for name, distribution in self.cfg.parameters.items()
+            }
+            for name, values in self.run_chunk(samples, sample_dim).items():
+                if name not in self.summaries:
+                    self.summaries[name] = StreamingSummary(self.cfg.quantiles)
+                self.summaries[name].update(values)
+            logging.info(f"Monte Carlo samples {start} to {stop - 1} completed.")
+
+        return {
+            name: summary.to_flodym(dims=self.output_dims[name], name=name)
+            for name, summary in self.summaries.items()
+        }
+
+    def run_chunk(
+        self, samples: dict[str, fd.Parameter], sample_dim: fd.Dimension
+    ) -> dict[str, np.ndarray]:
+        """Outputs of all samples of the chunk, with the samples as last axis."""
+        batch_outputs = []
+        start = 0
+        while start < sample_dim.len:
+            indices = list(range(start, min(start + self.batch_size, sample_dim.len)))
+            batch_outputs.append(self.run_batch(*self.get_batch(samples, sample_dim, indices)))
+            start = indices[-1] + 1
+        return {
+            name: np.concatenate([outputs[name] for outputs in batch_outputs], axis=-1)
+            for name in batch_outputs[0]
+        }
+
+    def run_batch(
+        self, samples: dict[str, fd.Parameter], sample_dim: fd.Dimension
+    ) -> dict[str, np.ndarray]:
+        """
+        Outputs of a batch of samples computed in one vectorized run. If it fails, the batch
+        size is reduced and the batch is computed in smaller batches instead.
+        """
+        if sample_dim.len == 1:
+            outputs = self.run_single(self.get_sample(samples, 0))
+            return {name: values[..., np.newaxis] for name, values in outputs.items()}
+
+        try:
+            outputs = self.run_vectorized(samples, sample_dim)
+        except Exception as e:
+            reason = f"the vectorized run failed with {type(e).__name__}: {e}"
+        else:
+            if self.vectorization_checked:
+                return outputs
+            mismatch = self.check_vectorization(outputs, samples)
+            if mismatch is None:
+                return outputs
+            reason = f"'{mismatch}' does not broadcast over the samples"
+
+        self.batch_size = max(sample_dim.len // 2, 1)
+        logging.info(
+            f"Computing Monte Carlo samples in batches of {self.batch_size}, since {reason}."
+        )
+        return self.run_chunk(samples, sample_dim)
+
+    def check_vectorization(
+        self, outputs: dict[str, np.ndarray], samples: dict[str, fd.Parameter]
+    ) -> Optional[str]:
+        """
+        Compares the first sample of a vectorized run to a run of this sample alone.
+        Returns the name of the first output that differs, or None if all agree.
+        Differences are relative to the largest value of each output, since values close to
+        zero may be the result of cancellation and differ by rounding errors.
+        """
+        reference = self.run_single(self.get_sample(samples, 0))
+        for name, values in reference.items():
+            vectorized = outputs[name]
+            scale = np.max(np.abs(values), initial=0.0, where=np.isfinite(values))
+            if vectorized.shape[:-1] != values.shape or not np.allclose(
+                vectorized[..., 0], values, rtol=1e-6, atol=1e-9 * max(scale, 1.0), equal_nan=True
+            ):
+                return name
+        self.vectorization_checked = True
+        return None
+
+    def run_vectorized(
+        self, samples: dict[str, fd.Parameter], sample_dim: fd.Dimension
+    ) -> dict[str, np.ndarray]:
+        model = copy(self.model)
+        model.dims = self.model.dims.expand_by([sample_dim])
+        model.definition_historic = add_sample_dimension(
+            self.model.definition_historic, SAMPLE_DIM_LETTER
+        )
+        model.definition_future = add_sample_dimension(
+            self.model.definition_future, SAMPLE_DIM_LETTER
+        )
+        # all parameters get the sample dimension, such that all computed arrays carry it
+        parameters = {
+            name: broadcast_to_samples(self.parameters[name], sample_dim)
+            for name in self.parameters
+            if name not in samples
+        }
+        parameters.update(samples)
+        return self.run_model(model, parameters)
+
+    def run_single(self, sample: dict[str, fd.Parameter]) -> dict[str, np.ndarray]:
+        return self.run_model(copy(self.model), sample)
+
+    def run_model(
+        self, model: "CommonModel", parameters: dict[str, fd.Parameter]
+    ) -> dict[str, np.ndarray]:
+        """Runs a shallow copy of the model with updated parameters and returns its outputs."""
+        model.parameters = self.parameters.copy()
+        model.parameters.update(parameters)
+        model.run_historic()
+        model.run_future()
+
+        mfa = model.future_mfa
+        arrays = {f"flows/{name}": flow for name, flow in mfa.flows.items()}
+        arrays.update({f"stocks/{name}": stock.stock for name, stock in mfa.stocks.items()})
+        outputs = {}
+        for name, array in arrays.items():
+            dims = array.dims
+            if SAMPLE_DIM_LETTER in dims.letters:
+                dims = dims.drop(SAMPLE_DIM_LETTER)
+            self.output_dims.setdefault(name, dims)
+            outputs[name] = array.values
+        return outputs
+
+    def get_batch(
+        self, samples: dict[str, fd.Parameter], sample_dim: fd.Dimension, indices: list[int]
+    ) -> tuple[dict[str, fd.Parameter], fd.Dimension]:
+        """Samples at the given positions of the sample dimension, with the reduced dimension."""
+        if len(indices) == sample_dim.len:
+            return samples, sample_dim
+        batch_dim = fd.Dimension(
+            name=sample_dim.name,
+            letter=sample_dim.letter,
+            items=[sample_dim.items[i] for i in indices],
+        )
+        batch = {
+            name: fd.Parameter(
+                dims=self.parameters[name].dims.expand_by([batch_dim]),
+                values=parameter.values[..., indices],
+                name=name,
+            )
+            for name, parameter in samples.items()
+        }
+        return batch, batch_dim
+
+    def get_sample(self, samples: dict[str, fd.Parameter], i: int) -> dict[str, fd.Parameter]:
+        """Single sample of each sampled parameter, with the dimensions of the original parameter."""
+        return {
+            name: fd.Parameter(
+                dims=self.parameters[name].dims, values=parameter.values[..., i], name=name
+            )
+            for name, parameter in samples.items()
+        }
@@ -1,10 +1,83 @@
 import numpy as np
 import flodym as fd
-from pydantic import ConfigDict, model_validator
+from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from pydantic import ConfigDict, Field, model_validator
+from scipy.optimize import least_squares
 
 from remind_mfa.common.helpers import RemindMFABaseModel
 
 
+class TradeSolvers(str, Enum):
+    FIXED_POINT = "fixed_point"
+    NEWTON = "newton"
+
+
+class CalibrationSolvers(str, Enum):
+    FIXED_POINT = "fixed_point"
+    ANDERSON = "anderson"
+
+
+class ConvergenceDiagnostics(RemindMFABaseModel):
+
+    converged: bool = False
+    """Whether the convergence criterion was met."""
+    n_iter: int = 0
+    """Number of iterations performed."""
+    residuals: list[float] = Field(default_factory=list)
+    """Maximum relative error after each iteration. For the Newton solver, the first entry is the initial error."""
+
+
+class TradeWorkspace(RemindMFABaseModel):
+    """
+    Preallocated arrays for repeatedly evaluating the bilateral trade on fixed dimensions.
+    Holds the combined export penalty and domestic preference factor over (R, r), and the buffers
+    for the logit shares and trade, which are computed in place.
+    """
+
+    dims: fd.DimensionSet
+    """Dimensions of the bilateral trade, with source region R and destination region r first."""
+    cost_factor: Optional[np.ndarray] = None
+    """Factor on the source price over (R, r) from export penalty and domestic preference."""
+    trade: Optional[np.ndarray] = None
+    """Buffer for the logit weights, shares and the bilateral trade over dims."""
+    weight_sum: Optional[np.ndarray] = None
+    """Buffer for the sum of the logit weights over source regions."""
+
+    @model_validator(mode="after")
+    def init_buffers(self):
+        n_regi = self.dims.shape[0]
+        self.cost_factor = np.ones((n_regi, n_regi))
+        self.trade = np.empty(self.dims.shape)
+        self.weight_sum = np.empty(self.dims.shape[1:])
+        return self
+
+    def set_cost_factor(self, export_penalty: np.ndarray, domestic_preference: np.ndarray):
+        """Export penalty of the source region off the diagonal, domestic preference on it."""
+        self.cost_factor[...] = export_penalty[:, np.newaxis]
+        np.fill_diagonal(self.cost_factor, domestic_preference)
+
+    def compute_trade(self, price: np.ndarray, demand: np.ndarray, mu: float) -> np.ndarray:
+        """
+        Bilateral trade in the trade buffer, from price and demand over dims without R,
+        where the price is that of the source region:
+        logit shares of the source regions times demand, excluding domestic supply.
+        The returned array is overwritten by the next call.
+        """
+        trade = self.trade
+        cost_factor = self.cost_factor.reshape(self.cost_factor.shape + (1,) * (trade.ndim - 2))
+        np.multiply(price[:, np.newaxis, ...], cost_factor, out=trade)
+        trade *= -mu
+        np.exp(trade, out=trade)
+        np.sum(trade, axis=0, out=self.weight_sum)
+        trade /= self.weight_sum
+        trade *= demand
+        n_regi = trade.shape[0]
+        trade[np.diag_indices(n_regi) + (slice(None),) * (trade.ndim - 2)] = 0.0
+        return trade
+
+
 class PriceDrivenTrade(RemindMFABaseModel):
 
     model_config = ConfigDict(extra="allow")
@@ -16,6 +89,24 @@ class PriceDrivenTrade(RemindMFABaseModel):
     learning_rate: float = 0.2
     convergence_tol: float = 0.01
     max_iter: int = 1000
+    solver: TradeSolvers = TradeSolvers.FIXED_POINT
+    """Solver for the market-clearing price: damped fixed-point iteration or Newton's method."""
+    max_log_price_step: float = 1.0
+    """Newton solver: maximum change of the log price per iteration."""
+    max_backtracking: int = 10
+    """Newton solver: maximum number of step halvings if a step increases the residual."""
+    calibration_solver: CalibrationSolvers = CalibrationSolvers.FIXED_POINT
+    """Solver for the calibration: fixed-point iteration, or the same iteration with Anderson mixing."""
+    anderson_depth: int = 5
+    """Anderson calibration: number of previous iterates used for mixing."""
+    per_year: bool = False
+    """Solve each year separately, warm-started from the equilibrium of the previous year."""
+    n_workers: int = 1
+    """Per-year solving: number of threads, each solving a block of consecutive years.
+    The per-year solves consist of numpy operations on arrays with one entry per region, which
+    mostly hold the GIL, so more threads do not speed up the solve. Since each block starts from
+    the base price instead of the previous year's equilibrium, the results also differ slightly
+    with the number of threads, within the convergence tolerance."""
     dims: fd.DimensionSet
 
     @model_validator(mode="after")
@@ -25,6 +116,12 @@ class PriceDrivenTrade(RemindMFABaseModel):
         self.all_dims = self.dims.expand_by([self.source_region])
         self.domestic_preference = None
         self.export_penalty = None
+        self.diagnostics: Optional[ConvergenceDiagnostics] = None
+        self.diagnostics_by_year: dict[int, ConvergenceDiagnostics] = {}
+        self.workspaces: dict[tuple[str, ...], TradeWorkspace] = {}
+        self.calibration_diagnostics: Optional[ConvergenceDiagnostics] = None
+        self.calibrated_export_penalty: Optional[fd.FlodymArray] = None
+        self.calibrated_domestic_preference: Optional[fd.FlodymArray] = None
         return self
 
     def compute_price_driven_trade(
@@ -39,6 +136,13 @@ class PriceDrivenTrade(RemindMFABaseModel):
         if self.domestic_preference is None:
             raise RuntimeError("Domestic preference not set. Call calibrate first.")
 
+        if self.per_year:
+            return self.compute_price_driven_trade_per_year(price_0, demand_0, supply_0)
+        if self.solver == TradeSolvers.NEWTON:
+            return self.compute_price_driven_trade_newton(price_0, demand_0, supply_0)
+
+        self.diagnostics = ConvergenceDiagnostics()
+
         # init values: multiplication makes a copy
         price = 1.0 * price_0
         supply = 1.0 * supply_0
@@ -60,11 +164,282 @@ class PriceDrivenTrade(RemindMFABaseModel):
             # check convergence
             excess = supply - supply_target
             max_error = np.max(np.abs(excess.values)) / np.max(np.abs(supply_target.values))
+            self.diagnostics.n_iter = i + 1
+            self.diagnostics.residuals.append(float(max_error))
             if max_error < self.convergence_tol:
+                self.diagnostics.converged = True
                 return price, demand, supply, imports, exports
 
         raise RuntimeError("Could not converge to a solution for the price driven trade.")
 
+    def compute_price_driven_trade_newton(
+        self,
+        price_0: fd.FlodymArray,
+        demand_0: fd.FlodymArray,
+        supply_0: fd.FlodymArray,
+    ):
+        """
+        Finds the market-clearing price by Newton's method in log price.
+        All slices of the dimensions other than region are solved simultaneously.
+        """
+        log_price_0, demand_base, supply_base = self.region_last_arrays(price_0, demand_0, supply_0)
+        log_price, self.diagnostics = self.newton_iteration(
+            log_price_0.copy(), log_price_0, demand_base, supply_base, self.cost_factor()
+        )
+        return self.trade_at_log_price(log_price, price_0, demand_0, supply_0)
+
+    def compute_price_driven_trade_per_year(
+        self,
+        price_0: fd.FlodymArray,
+        demand_0: fd.FlodymArray,
+        supply_0: fd.FlodymArray,
+    ):
+        """
+        Solves each year separately with the chosen solver, such that slowly converging years do
+        not keep the others iterating. The years are split into n_workers blocks of consecutive
+        years, which are solved in threads (see `n_workers`). Within a block, each year is
+        warm-started with the relative price deviation of the previous year's equilibrium.
+        Convergence is checked for each year separately.
+        """
+        if "t" not in price_0.dims.letters:
+            raise ValueError("Per-year solving requires a time dimension.")
+        log_price_0, demand_base, supply_base = self.region_last_arrays(price_0, demand_0, supply_0)
+        t_axis = [l for l in price_0.dims.letters if l != "r"].index("t")
+        log_price_0, demand_base, supply_base = (
+            np.moveaxis(a, t_axis, 0) for a in (log_price_0, demand_base, supply_base)
+        )
+        cost_factor = self.cost_factor()
+        n_t = log_price_0.shape[0]
+
+        log_price = np.empty_like(log_price_0)
+        diagnostics = [None] * n_t
+
+        def solve_block(block: np.ndarray):
+            deviation = np.zeros_like(log_price_0[0])
+            for t in block:
+                log_price[t], diagnostics[t] = self.solve_log_price(
+                    log_price_0[t] + deviation,
+                    log_price_0[t],
+                    demand_base[t],
+                    supply_base[t],
+                    cost_factor,
+                )
+                deviation = log_price[t] - log_price_0[t]
+
+        blocks = np.array_split(np.arange(n_t), min(self.n_workers, n_t))
+        if len(blocks) > 1:
+            with ThreadPoolExecutor(max_workers=len(blocks)) as executor:
+                list(executor.map(solve_block, blocks))
+        else:
+            solve_block(blocks[0])
+
+        self.diagnostics_by_year = dict(zip(price_0.dims["t"].items, diagnostics))
+        self.diagnostics = self.combine_diagnostics(diagnostics)
+        log_price = np.moveaxis(log_price, 0, t_axis)
+        return self.trade_at_log_price(log_price, price_0, demand_0, supply_0)
+
+    def solve_log_price(
+        self,
+        log_price: np.ndarray,
+        log_price_0: np.ndarray,
+        demand_0: np.ndarray,
+        supply_0: np.ndarray,
+        cost_factor: np.ndarray,
+    ) -> tuple[np.ndarray, ConvergenceDiagnostics]:
+        """Solves for the market-clearing log price on arrays with regions as last axis."""
+        if self.solver == TradeSolvers.NEWTON:
+            return self.newton_iteration(log_price, log_price_0, demand_0, supply_0, cost_factor)
+        return self.fixed_point_iteration(log_price, log_price_0, demand_0, supply_0, cost_factor)
+
+    def fixed_point_iteration(
+        self,
+        log_price: np.ndarray,
+        log_price_0: np.ndarray,
+        demand_0: np.ndarray,
+        supply_0: np.ndarray,
+        cost_factor: np.ndarray,
+    ) -> tuple[np.ndarray, ConvergenceDiagnostics]:
+        """
+        Damped fixed-point iteration of compute_price_driven_trade on arrays with regions as last
+        axis, starting from log_price. Convergence is checked before each price update.
+        """
+        diagnostics = ConvergenceDiagnostics()
+        for i in range(self.max_iter):
+            excess, sales, x = self.excess_supply(
+                log_price, log_price_0, demand_0, supply_0, cost_factor
+            )
+            max_error = np.max(np.abs(excess)) / np.max(np.abs(sales))
+            diagnostics.residuals.append(float(max_error))
+            if max_error < self.convergence_tol:
+                diagnostics.converged = True
+                return log_price, diagnostics
+            log_price = log_price + self.learning_rate / self.eta_supply * np.log(
+                sales / x["supply"]
+            )
+            diagnostics.n_iter = i + 1
+
+        raise RuntimeError("Could not converge to a solution for the price driven trade.")
+
+    def newton_iteration(
+        self,
+        log_price: np.ndarray,
+        log_price_0: np.ndarray,
+        demand_0: np.ndarray,
+        supply_0: np.ndarray,
+        cost_factor: np.ndarray,
+    ) -> tuple[np.ndarray, ConvergenceDiagnostics]:
+        """
+        Newton's method for the market-clearing log price on arrays with regions as last axis,
+        starting from log_price. The Jacobian of the excess supply is computed analytically from
+        the logit origin shares, and all slices are solved as a batched linear system.
+        Step sizes are limited, and halved for slices where a step increases the residual.
+        Converges to the same criterion as the fixed-point iteration.
+        """
+        diagnostics = ConvergenceDiagnostics()
+
+        def residual(log_price):
+            excess, sales, _ = self.excess_supply(
+                log_price, log_price_0, demand_0, supply_0, cost_factor
+            )
+            return excess, np.max(np.abs(excess)) / np.max(np.abs(sales))
+
+        def slice_norm(excess):
+            return np.max(np.abs(excess), axis=-1)
+
+        log_price = log_price.copy()
+        excess, max_error = residual(log_price)
+        diagnostics.residuals.append(float(max_error))
+        for i in range(self.max_iter):
+            if max_error < self.convergence_tol:
+                break
+
+            jacobian = self.excess_supply_jacobian(
+                log_price, log_price_0, demand_0, supply_0, cost_factor
+            )
+            step = -np.linalg.solve(jacobian, excess[..., np.newaxis])[..., 0]
+            step_size = np.max(np.abs(step), axis=-1, keepdims=True)
+            step *= np.minimum(1.0, self.max_log_price_step / np.maximum(step_size, 1e-300))
+
+            # halve step for slices where the residual increases
+            new_excess, new_max_error = residual(log_price + step)
+            for _ in range(self.max_backtracking):
+                worse = slice_norm(new_excess) > slice_norm(excess)
+                if not np.any(worse):
+                    break
+                step[worse] *= 0.5
+                new_excess, new_max_error = residual(log_price + step)
+
+            log_price += step
+            excess, max_error = new_excess, new_max_error
+            diagnostics.n_iter = i + 1
+            diagnostics.residuals.append(float(max_error))
+
+        if max_error >= self.convergence_tol:
+            raise RuntimeError("Could not converge to a solution for the price driven trade.")
+        diagnostics.converged = True
+        return log_price, diagnostics
+
+    @staticmethod
+    def combine_diagnostics(diagnostics: list[ConvergenceDiagnostics]) -> ConvergenceDiagnostics:
+        """
+        Combines the diagnostics of separately solved slices: iterations are summed, and the
+        residual history is the maximum over slices, where converged slices keep their last residual.
+        """
+        n_residuals = max(len(d.residuals) for d in diagnostics)
+        padded = [
+            d.residuals + d.residuals[-1:] * (n_residuals - len(d.residuals)) for d in diagnostics
+        ]
+        return ConvergenceDiagnostics(
+            converged=all(d.converged for d in diagnostics),
+            n_iter=sum(d.n_iter for d in diagnostics),
+            residuals=list(np.max(padded, axis=0)),
+        )
+
+    def region_last_arrays(
+        self,
+        price_0: fd.FlodymArray,
+        demand_0: fd.FlodymArray,
+        supply_0: fd.FlodymArray,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Log of base price, and base demand and supply, as plain arrays with regions as last axis."""
+        dims = price_0.dims
+        r_axis = dims.index("r")
+        log_price_0 = np.moveaxis(np.log(price_0.values), r_axis, -1)
+        demand_base = np.moveaxis(demand_0.cast_values_to(dims), r_axis, -1)
+        supply_base = np.moveaxis(supply_0.cast_values_to(dims), r_axis, -1)
+        return log_price_0, demand_base, supply_base
+
+    def cost_factor(self) -> np.ndarray:
+        """Factor on the source price over (R, r) from export penalty and domestic preference."""
+        return self.export_penalty_cast().values * self.domestic_preference_cast().values
+
+    def trade_at_log_price(
+        self,
+        log_price: np.ndarray,
+        price_0: fd.FlodymArray,
+        demand_0: fd.FlodymArray,
+        supply_0: fd.FlodymArray,
+    ):
+        """Price, demand, supply, imports and exports at a log price with regions as last axis."""
+        r_axis = price_0.dims.index("r")
+        price = fd.FlodymArray(dims=price_0.dims, values=np.exp(np.moveaxis(log_price, -1, r_axis)))
+        demand = demand_0 * (price / price_0) ** self.eta_demand
+        supply = supply_0 * (price / price_0) ** self.eta_supply
+        imports, exports = self.get_trade(price, demand)
+        return price, demand, supply, imports, exports
+
+    def excess_supply(
+        self,
+        log_price: np.ndarray,
+        log_price_0: np.ndarray,
+        demand_0: np.ndarray,
+        supply_0: np.ndarray,
+        cost_factor: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+        """
+        Excess supply (supply minus sales of each region, including domestic sales) at the given
+        log price, on arrays with regions as last axis and cost_factor over (R, r).
+        Also returns sales and the intermediate arrays needed for the Jacobian.
+        """
+        price = np.exp(log_price)
+        relative_log_price = log_price - log_price_0
+        demand = demand_0 * np.exp(self.eta_demand * relative_log_price)
+        supply = supply_0 * np.exp(self.eta_supply * relative_log_price)
+        # logit origin shares over R; shifting by the maximum does not change the shares
+        utility = -self.mu * price[..., :, np.newaxis] * cost_factor
+        shares = np.exp(utility - np.max(utility, axis=-2, keepdims=True))
+        shares /= np.sum(shares, axis=-2, keepdims=True)
+        sales = np.einsum("...Rr,...r->...R", shares, demand)
+        intermediates = {"price": price, "demand": demand, "supply": supply, "shares": shares}
+        return supply - sales, sales, intermediates
+
+    def excess_supply_jacobian(
+        self,
+        log_price: np.ndarray,
+        log_price_0: np.ndarray,
+        demand_0: np.ndarray,
+        supply_0: np.ndarray,
+        cost_factor: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Jacobian of the excess supply of region R with respect to the log price of region Q,
+        with shape (..., R, Q). Derived from the logit shares s[R, r] with utility -mu * p_R * c[R, r]:
+        d s[R, r] / d log p_Q = -mu * p_Q * c[Q, r] * s[R, r] * (delta_RQ - s[Q, r]).
+        """
+        _, _, x = self.excess_supply(log_price, log_price_0, demand_0, supply_0, cost_factor)
+        price, demand, supply, shares = x["price"], x["demand"], x["supply"], x["shares"]
+        sales_by_destination = shares * demand[..., np.newaxis, :]
+        weighted_shares = shares * cost_factor * demand[..., np.newaxis, :]
+        diagonal = self.eta_supply * supply + self.mu * price * np.sum(
+            sales_by_destination * cost_factor, axis=-1
+        )
+        cross = np.einsum("...Rr,...Qr->...RQ", shares, weighted_shares)
+        jacobian = (
+            -self.mu * cross * price[..., np.newaxis, :] - self.eta_demand * sales_by_destination
+        )
+        jacobian += diagonal[..., np.newaxis] * np.eye(self.n_regi)
+        return jacobian
+
     def calibrate(
         self,
         demand: fd.FlodymArray,
@@ -72,7 +447,15 @@ class PriceDrivenTrade(RemindMFABaseModel):
         imports_target: fd.FlodymArray,
         exports_target: fd.FlodymArray,
     ):
+        """
+        Calibrates export penalty and domestic preference to the target trade.
+        If the inputs have dimensions other than region, e.g. several base years, or if the Anderson
+        solver is chosen, calibrate_vectorized is used.
+        """
+        if demand.dims.letters != ("r",) or self.calibration_solver == CalibrationSolvers.ANDERSON:
+            return self.calibrate_vectorized(demand, price, imports_target, exports_target)
 
+        self.calibration_diagnostics = ConvergenceDiagnostics()
         self.export_penalty = fd.FlodymArray(dims=self.all_dims["r",])
         self.export_penalty[...] = 1.0
         self.domestic_preference = fd.FlodymArray(dims=self.all_dims["r",])
@@ -102,34 +485,200 @@ class PriceDrivenTrade(RemindMFABaseModel):
             )
             self.domestic_preference += self.learning_rate * domestic_preference_diff
 
+            self.calibration_diagnostics.n_iter = i + 1
+            self.calibration_diagnostics.residuals.append(
+                float(
+                    max(
+                        abs(export_penalty_diff.values).max(),
+                        abs(domestic_preference_diff.values).max(),
+                    )
+                )
+            )
             if self.almost_zero(export_penalty_diff) and self.almost_zero(domestic_preference_diff):
+                self.calibration_diagnostics.converged = True
                 return
 
         raise RuntimeError(
             "Could not converge to a solution for the export penalty and domestic preference."
         )
 
+    def calibrate_vectorized(
+        self,
+        demand: fd.FlodymArray,
+        price: fd.FlodymArray,
+        imports_target: fd.FlodymArray,
+        exports_target: fd.FlodymArray,
+    ):
+        """
+        Calibration on plain arrays, where all slices of dimensions other than region (e.g. several
+        base years) are calibrated independently and simultaneously.
+        The update is the same as in calibrate. With the Anderson solver, the root of the update
+        step is found by Anderson mixing of the previous iterates.
+        The calibrated values by slice are stored. The model uses one joint parameter set for all
+        slices, which minimizes the log deviations from the target shares of all slices in the least
+        squares sense, starting from the mean of the values by slice.
+        """
+        dims = demand.dims
+        r_axis = dims.index("r")
+
+        def region_last(array: fd.FlodymArray) -> np.ndarray:
+            return np.moveaxis(array.cast_values_to(dims), r_axis, -1)
+
+        demand_values = region_last(demand)
+        price_values = region_last(price)
+        exports_target_values = region_last(exports_target)
+        export_shares_target = exports_target_values / exports_target_values.sum(
+            axis=-1, keepdims=True
+        )
+        domestic_share_target = (demand_values - region_last(imports_target)) / demand_values
+
+        n = self.n_regi
+        depth = self.anderson_depth if self.calibration_solver == CalibrationSolvers.ANDERSON else 0
+
+        def trade_shares(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+            export_penalty, domestic_preference = x[..., :n], x[..., n:]
+            cost_factor = export_penalty[..., :, np.newaxis] * np.ones(n)
+            diagonal = (Ellipsis,) + np.diag_indices(n)
+            cost_factor[diagonal] = domestic_preference
+            utility = -self.mu * price_values[..., :, np.newaxis] * cost_factor
+            shares = np.exp(utility - utility.max(axis=-2, keepdims=True))
+            shares /= shares.sum(axis=-2, keepdims=True)
+            domestic_share = shares[diagonal]
+            exports = np.einsum("...Rr,...r->...R", shares, demand_values)
+            exports -= domestic_share * demand_values
+            return exports / exports.sum(axis=-1, keepdims=True), domestic_share
+
+        def update(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+            export_penalty, domestic_preference = x[..., :n], x[..., n:]
+            export_shares, domestic_share = trade_shares(x)
+            export_penalty_diff = np.log(export_shares / export_shares_target) / (
+                self.mu * price_values * domestic_preference
+            )
+            export_penalty = export_penalty + self.learning_rate * export_penalty_diff
+            # normalize to avoid run-off
+            export_penalty += 1.0 - export_penalty.min(axis=-1, keepdims=True)
+
+            domestic_preference_diff = np.log(domestic_share / domestic_share_target) / (
+                self.mu * price_values * export_penalty
+            )
+            domestic_preference = (
+                domestic_preference + self.learning_rate * domestic_preference_diff
+            )
+
+            x_new = np.concatenate([export_penalty, domestic_preference], axis=-1)
+            error = np.maximum(
+                np.abs(export_penalty_diff).max(axis=-1),
+                np.abs(domestic_preference_diff).max(axis=-1),
+            )
+            return x_new, error
+
+        self.calibration_diagnostics = ConvergenceDiagnostics()
+        x = np.ones(demand_values.shape[:-1] + (2 * n,))
+        x_history, f_history = [], []
+        for i in range(self.max_iter):
+            g, error = update(x)
+            self.calibration_diagnostics.n_iter = i + 1
+            self.calibration_diagnostics.residuals.append(float(error.max()))
+            if error.max() < self.convergence_tol:
+                self.calibration_diagnostics.converged = True
+                x = g
+                break
+
+            x_history = (x_history + [x])[-(depth + 1) :]
+            f_history = (f_history + [g - x])[-(depth + 1) :]
+            x = g
+            if len(f_history) > 1:
+                x = self.anderson_mixing(x_history, f_history, fallback=g, n_penalty=n)
+        else:
+            raise RuntimeError(
+                "Could not converge to a solution for the export penalty and domestic preference."
+            )
+
+        values = np.moveaxis(x, -1, r_axis)
+        self.calibrated_export_penalty = fd.FlodymArray(
+            dims=dims, values=np.take(values, np.arange(n), axis=r_axis)
+        )
+        self.calibrated_domestic_preference = fd.FlodymArray(
+            dims=dims, values=np.take(values, np.arange(n, 2 * n), axis=r_axis)
+        )
+
+        def normalize(x_joint: np.ndarray) -> np.ndarray:
+            # as in the update, to avoid run-off of the export penalty
+            x_joint = x_joint.copy()
+            x_joint[:n] += 1.0 - x_joint[:n].min()
+            return x_joint
+
+        def residuals(x_joint: np.ndarray) -> np.ndarray:
+            x_joint = normalize(x_joint)
+            export_shares, domestic_share = trade_shares(np.broadcast_to(x_joint, x.shape))
+            return np.concatenate(
+                [
+                    np.log(export_shares / export_shares_target).ravel(),
+                    np.log(domestic_share / domestic_share_target).ravel(),
+                ]
+            )
+
+        x_start = x.reshape(-1, 2 * n).mean(axis=0)
+        if x.size > 2 * n:
+            joint_values = normalize(least_squares(residuals, x_start).x)
+        else:
+            joint_values = x_start
+        self.export_penalty = fd.FlodymArray(dims=self.all_dims["r",], values=joint_values[:n])
+        self.domestic_preference = fd.FlodymArray(dims=self.all_dims["r",], values=joint_values[n:])
+
+    @staticmethod
+    def anderson_mixing(
+        x_history: list[np.ndarray],
+        f_history: list[np.ndarray],
+        fallback: np.ndarray,
+        n_penalty: int,
+    ) -> np.ndarray:
+        """
+        Anderson mixing of the last iterates x and their update steps f = g(x) - x, independently
+        for each slice: finds the combination of the previous steps that minimizes the new step.
+        The export penalty, given by the first n_penalty entries, is normalized as in the update.
+        Slices with non-finite or non-positive mixed iterates use the fallback.
+        """
+        x_last, f_last = x_history[-1], f_history[-1]
+        delta_x = np.stack([b - a for a, b in zip(x_history[:-1], x_history[1:])], axis=-1)
+        delta_f = np.stack([b - a for a, b in zip(f_history[:-1], f_history[1:])], axis=-1)
+        normal_matrix = np.einsum("...km,...kl->...ml", delta_f, delta_f)
+        # small regularization for linearly dependent steps
+        regularization = 1e-10 * np.trace(normal_matrix, axis1=-2, axis2=-1) + 1e-300
+        normal_matrix += regularization[..., np.newaxis, np.newaxis] * np.eye(delta_f.shape[-1])
+        rhs = np.einsum("...km,...k->...m", delta_f, f_last)
+        gamma = np.linalg.solve(normal_matrix, rhs[..., np.newaxis])[..., 0]
+        x = x_last + f_last - np.einsum("...km,...m->...k", delta_x + delta_f, gamma)
+        x[..., :n_penalty] += 1.0 - x[..., :n_penalty].min(axis=-1, keepdims=True)
+
+        invalid = ~np.all(np.isfinite(x) & (x > 0), axis=-1)
+        x[invalid] = fallback[invalid]
+        return x
+
     def almost_zero(self, array: fd.FlodymArray) -> bool:
         return max(abs(array.values)) < self.convergence_tol
 
     def get_trade(
         self, price: fd.FlodymArray, demand: fd.FlodymArray
     ) -> tuple[fd.FlodymArray, fd.FlodymArray]:
-        dims = self.all_dims[
-            (
-                "R",
-                "r",
-            )
-            + tuple(l for l in price.dims.letters if l != "r")
-        ]
-        trade = fd.FlodymArray(dims=dims)
-        trade[...] = self.origin_shares(price) * demand
-        diag_indices = np.diag_indices(self.n_regi) + (slice(None),) * (trade.dims.ndim - 2)
-        trade.values[diag_indices] = 0.0
-        imports = trade.sum_over("R")
-        exports = trade.sum_over("r")[{"R": self.dims["r"]}]
+        other_letters = tuple(l for l in price.dims.letters if l != "r")
+        workspace = self.get_workspace(other_letters)
+        workspace.set_cost_factor(self.export_penalty.values, self.domestic_preference.values)
+        destination_dims = self.all_dims[("r",) + other_letters]
+        trade = workspace.compute_trade(
+            price.cast_values_to(destination_dims), demand.cast_values_to(destination_dims), self.mu
+        )
+        imports = fd.FlodymArray(dims=destination_dims, values=trade.sum(axis=0))
+        exports = fd.FlodymArray(dims=destination_dims, values=trade.sum(axis=1))
         return imports, exports
 
+    def get_workspace(self, other_letters: tuple[str, ...]) -> TradeWorkspace:
+        """Workspace for trade with dimensions other than regions given by other_letters."""
+        if other_letters not in self.workspaces:
+            dims = self.all_dims[("R", "r") + other_letters]
+            self.workspaces[other_letters] = TradeWorkspace(dims=dims)
+        return self.workspaces[other_letters]
+
     def origin_shares(self, price: fd.FlodymArray) -> fd.FlodymArray:
         local_price = (
             self.price_cast(price) * self.export_penalty_cast() * self.domestic_preference_cast()
@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import platform
+import functools
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from importlib import metadata
+from typing import Callable, Optional
+import pandas as pd
+from pydantic import PrivateAttr
+
+from remind_mfa.common.helpers import RemindMFABaseModel
+
+_active_profiler: Optional["StageProfiler"] = None
+"""Profiler of the stage currently running, such that nested steps can be profiled without passing it around."""
+
+
+class StageRecord(RemindMFABaseModel):
+    name: str
+    """Name of the stage."""
+    parent: Optional[str] = None
+    """Name of the enclosing stage, if any."""
+    depth: int = 0
+    """Nesting level of the stage."""
+    wall_time_s: float
+    """Elapsed wall-clock time in seconds."""
+    cpu_time_s: float
+    """Elapsed CPU time of the process in seconds."""
+    peak_memory_mb: Optional[float] = None
+    """Peak traced memory during the stage in MB. Only set if memory is tracked."""
+    memory_diff_mb: Optional[float] = None
+    """Traced memory at the end minus traced memory at the start of the stage in MB. Only set if memory is tracked."""
+
+
+class _OpenStage(RemindMFABaseModel):
+    name: str
+    wall_start: float
+    cpu_start: float
+    memory_start: int = 0
+    peak: int = 0
+    """Highest peak of all finished sub-stages, since the tracemalloc peak is reset for each sub-stage."""
+
+
+class StageProfiler(RemindMFABaseModel):
+    """
+    Records wall time, CPU time and optionally the tracemalloc memory peak of named stages.
+    Stages can be nested. While a stage is running, the profiler is registered as active, such
+    that functions decorated with `profiled` are recorded as sub-stages.
+    If disabled, stages are run without any overhead.
+    """
+
+    enabled: bool = True
+    """Whether stages are recorded."""
+    track_memory: bool = False
+    """Whether to record memory peaks with tracemalloc. This slows down the computations considerably."""
+    records: list[StageRecord] = []
+    """Finished stages in the order of their completion."""
+    _open_stages: list[_OpenStage] = PrivateAttr(default_factory=list)
+    _started_tracemalloc: bool = PrivateAttr(default=False)
+    """Whether this profiler started tracemalloc, such that it stops it again after the outermost stage."""
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        global _active_profiler
+        previous_profiler = _active_profiler
+        _active_profiler = self
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        open_stage = self.start_stage(name)
+        try:
+            yield
+        finally:
+            self.finish_stage(open_stage)
+            _active_profiler = previous_profiler
+            if self._started_tracemalloc and not self._open_stages:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def start_stage(self, name: str) -> _OpenStage:
+        if self.track_memory:
+            memory_current, memory_peak = tracemalloc.get_traced_memory()
+            if self._open_stages:
+                parent = self._open_stages[-1]
+                parent.peak = max(parent.peak, memory_peak)
+            tracemalloc.reset_peak()
+        else:
+            memory_current = 0
+        open_stage = _OpenStage(
+            name=name,
+            wall_start=time.perf_counter(),
+            cpu_start=time.process_time(),
+            memory_start=memory_current,
+        )
+        self._open_stages.append(open_stage)
+        return open_stage
+
+    def finish_stage(self, open_stage: _OpenStage):
+        wall_time = time.perf_counter() - open_stage.wall_start
+        cpu_time = time.process_time() - open_stage.cpu_start
+        self._open_stages.pop()
+        parent = self._open_stages[-1] if self._open_stages else None
+
+        peak_memory_mb = memory_diff_mb = None
+        if self.track_memory:
+            memory_current, memory_peak = tracemalloc.get_traced_memory()
+            peak = max(open_stage.peak, memory_peak)
+            if parent is not None:
+                parent.peak = max(parent.peak, peak)
+            peak_memory_mb = peak / 1e6
+            memory_diff_mb = (memory_current - open_stage.memory_start) / 1e6
+
+        self.records.append(
+            StageRecord(
+                name=open_stage.name,
+                parent=parent.name if parent is not None else None,
+                depth=len(self._open_stages),
+                wall_time_s=wall_time,
+                cpu_time_s=cpu_time,
+                peak_memory_mb=peak_memory_mb,
+                memory_diff_mb=memory_diff_mb,
+            )
+        )
+
+    def to_df(self) -> pd.DataFrame:
+        return pd.DataFrame([r.model_dump() for r in self.records])
+
+    def write(self, path: str, name: str, run_info: Optional[dict] = None):
+        """
+        Writes the recorded stages to `<path>/<name>.json` and `<path>/<name>.csv`.
+        The JSON file additionally contains information on the run and the package versions,
+        such that reports of different releases can be compared.
+        """
+        if not self.enabled:
+            return
+        os.makedirs(path, exist_ok=True)
+        info = {**environment_info(), "track_memory": self.track_memory, **(run_info or {})}
+        with open(os.path.join(path, f"{name}.json"), "w") as f:
+            json.dump({"info": info, "stages": [r.model_dump() for r in self.records]}, f, indent=2)
+        df = self.to_df()
+        for key in ["remind_mfa_version", "flodym_version"]:
+            df[key] = info[key]
+        df.to_csv(os.path.join(path, f"{name}.csv"), index=False)
+
+
+def environment_info() -> dict:
+    """Versions and platform information to identify the environment a profile was recorded in."""
+
+    def version(package: str) -> Optional[str]:
+        try:
+            return metadata.version(package)
+        except metadata.PackageNotFoundError:
+            return None
+
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "remind_mfa_version": version("remind-mfa"),
+        "flodym_version": version("flodym"),
+        "numpy_version": version("numpy"),
+        "python_version": sys.version.split()[0],
+        "platform": platform.platform(),
+    }
+
+
+def profile_stage(name: str):
+    """Context manager recording a stage with the active profiler, if there is one."""
+    if _active_profiler is None:
+        return nullcontext()
+    return _active_profiler.stage(name)
+
+
+def profiled(func: Callable) -> Callable:
+    """Decorator recording each call of the function as a stage with the active profiler."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with profile_stage(func.__qualname__):
+            return func(*args, **kwargs)
+
+    return wrapper
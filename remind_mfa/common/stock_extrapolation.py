@@ -1,13 +1,17 @@
+import functools
 import flodym as fd
 import numpy as np
 from typing import Tuple, Union, Type, Optional
 from copy import deepcopy
 
 from remind_mfa.common.data_extrapolations import Extrapolation
-from remind_mfa.common.data_transformations import broadcast_trailing_dimensions, BoundList
+from remind_mfa.common.fit_cache import get_fit_cache
+from remind_mfa.common.data_transformations import BoundList
 from remind_mfa.common.assumptions_doc import add_assumption_doc
 from remind_mfa.common.helpers import RegressOverModes
 from remind_mfa.common.common_config import ModelSwitches
+from remind_mfa.common.profiling import profiled
+from remind_mfa.common.monte_carlo import SAMPLE_DIM_LETTER, sample_letters
 
 
 class StockExtrapolation:
@@ -51,9 +55,18 @@ class StockExtrapolation:
         self.target_dim_letters = target_dim_letters
         self.set_dims(indep_fit_dim_letters)
         self.bound_list = bound_list
+        if SAMPLE_DIM_LETTER in self.indep_fit_dim_letters and bound_list.bound_list:
+            # the same bounds apply to all Monte Carlo samples
+            self.bound_list = BoundList(
+                bound_list=list(bound_list.bound_list),
+                target_dims=self.dims[self.indep_fit_dim_letters],
+            )
         self.do_gdppc_accumulation = do_gdppc_accumulation
         self.weight = weight
         self.stock_correction = stock_correction
+        self.fit_cache = None
+        if self.cfg.fit_cache_path is not None:
+            self.fit_cache = get_fit_cache(self.cfg.fit_cache_path)
         self.extrapolate()
 
     def set_dims(self, indep_fit_dim_letters: Tuple[str, ...]):
@@ -68,6 +81,11 @@ class StockExtrapolation:
             self.historic_dim_letters = self.historic_stocks.dims.letters
             self.target_dim_letters = ("t",) + self.historic_dim_letters[1:]
         else:
+            if (
+                SAMPLE_DIM_LETTER in self.historic_stocks.dims.letters
+                and SAMPLE_DIM_LETTER not in self.target_dim_letters
+            ):
+                self.target_dim_letters = tuple(self.target_dim_letters) + (SAMPLE_DIM_LETTER,)
             self.historic_dim_letters = ("h",) + self.target_dim_letters[1:]
 
         if indep_fit_dim_letters == "all":
@@ -77,6 +95,12 @@ class StockExtrapolation:
             self.indep_fit_dim_letters = indep_fit_dim_letters
             if not set(self.indep_fit_dim_letters).issubset(self.target_dim_letters):
                 raise ValueError("fit_dim_letters must be subset of target_dim_letters.")
+        # Monte Carlo samples are never fitted together
+        if (
+            SAMPLE_DIM_LETTER in self.target_dim_letters
+            and SAMPLE_DIM_LETTER not in self.indep_fit_dim_letters
+        ):
+            self.indep_fit_dim_letters = tuple(self.indep_fit_dim_letters) + (SAMPLE_DIM_LETTER,)
         self.get_fit_idx()
 
     def get_fit_idx(self):
@@ -87,6 +111,7 @@ class StockExtrapolation:
             if x in self.indep_fit_dim_letters
         )
 
+    @profiled
     def extrapolate(self):
         """Preprocessing and extrapolation."""
         self.per_capita_transformation()
@@ -97,8 +122,9 @@ class StockExtrapolation:
         self.gdppc = self.parameters["gdppc"]
         if self.do_gdppc_accumulation:
             self.gdppc_acc = np.maximum.accumulate(self.gdppc.values, axis=0)
-        self.historic_pop = fd.Parameter(dims=self.dims[("h", "r")])
-        self.historic_gdppc = fd.Parameter(dims=self.dims[("h", "r")])
+        historic_letters = ("h", "r") + sample_letters(self.dims)
+        self.historic_pop = fd.Parameter(dims=self.dims[historic_letters])
+        self.historic_gdppc = fd.Parameter(dims=self.dims[historic_letters])
         self.historic_stocks_pc = fd.StockArray(dims=self.dims[self.historic_dim_letters])
         self.stocks_pc = fd.StockArray(dims=self.dims[self.target_dim_letters])
         self.stocks = fd.StockArray(dims=self.dims[self.target_dim_letters])
@@ -113,7 +139,7 @@ class StockExtrapolation:
         prediction_out = self.stocks_pc.values.copy()
         historic_in = self.historic_stocks_pc.values
         if self.do_gdppc_accumulation:
-            gdppc = self.gdppc_acc
+            gdppc = fd.FlodymArray(dims=self.gdppc.dims, values=self.gdppc_acc)
             add_assumption_doc(
                 type="model assumption",
                 name="Usage of cumulative GDP per capita",
@@ -124,7 +150,7 @@ class StockExtrapolation:
             )
         else:
             gdppc = self.gdppc
-        gdppc = broadcast_trailing_dimensions(gdppc, prediction_out)
+        gdppc = gdppc.cast_to(self.stocks_pc.dims).values
         n_historic = historic_in.shape[0]
 
         n_deriv = 5
@@ -176,6 +202,9 @@ class StockExtrapolation:
             predictor_values=predictor,
             independent_dims=self.fit_dim_idx,
             bound_list=self.bound_list,
+            batched=self.cfg.batch_regression,
+            fit_cache=self.fit_cache,
+            n_workers=self.cfg.regression_workers,
         )
         pure_prediction = self.extrapolation.regress()
 
@@ -229,7 +258,7 @@ class StockExtrapolation:
 
     def loggdp_time_regression(self, gdppc, weight: float) -> np.ndarray:
         time = np.array(self.dims["t"].items)
-        predictor = np.log10(gdppc[...]) * weight + time[:, None, None]
+        predictor = np.log10(gdppc[...]) * weight + time.reshape(-1, *([1] * (gdppc.ndim - 1)))
         return predictor
 
     def gaussian_correction(
@@ -239,6 +268,8 @@ class StockExtrapolation:
         Gaussian smoothing of extrapolation between the historic and future interface to remove discontinuities
         of 0th and 1st order derivatives. Multiplies Gaussian with a Taylor expansion around
         the difference beteween historic and fit.
+        The correction is computed for all entries at once, with time as the first axis and any
+        number of further axes, e.g. regions, goods or samples.
         Args:
             historic (np.ndarray): Historical stock data.
             prediction (np.ndarray): Predicted stock data from regression.
@@ -246,34 +277,6 @@ class StockExtrapolation:
         Returns:
             np.ndarray: Corrected stock data after applying Gaussian smoothing.
         """
-        time = np.array(self.dims["t"].items)
-        last_history_idx = len(historic) - 1
-        last_history_year = time[last_history_idx]
-        # offset between historic and prediction at transition point
-        difference_0th = historic[last_history_idx, :] - prediction[last_history_idx, :]
-
-        def lin_fit(x, y, last_idx, n=n):
-            """Linear fit of the last n points."""
-            x_cut = np.vstack([x[last_idx - n : last_idx], np.ones(n)]).T
-            y_cut = y[last_idx - n : last_idx, :]
-            y_reshaped = y_cut.reshape(n, -1).T
-            slopes = [np.linalg.lstsq(x_cut, y_dim, rcond=None)[0][0] for y_dim in y_reshaped]
-            slopes_reshaped = np.array(slopes).reshape(y.shape[1:])
-            return slopes_reshaped
-
-        last_historic_1st = lin_fit(time, historic, last_history_idx)
-        last_prediction_1st = lin_fit(time, prediction, last_history_idx)
-
-        # offset of the 1st derivative at the transition point
-        difference_1st = (last_historic_1st - last_prediction_1st) / (
-            last_history_year - time[last_history_idx - 1]
-        )
-
-        def gaussian(t, approaching_time):
-            """After the approaching time, the amplitude of the gaussian has decreased to 5%."""
-            a = np.sqrt(np.log(20))
-            return np.exp(-((a * t / approaching_time) ** 2))
-
         approaching_time_0th = 50
         add_assumption_doc(
             type="integer number",
@@ -293,13 +296,67 @@ class StockExtrapolation:
                 "growth rates. "
             ),
         )
-        time_extended = time.reshape(-1, *([1] * len(difference_0th.shape)))
-        corr0 = difference_0th * gaussian(time_extended - last_history_year, approaching_time_0th)
-        corr1 = (
-            difference_1st
-            * (time_extended - last_history_year)
-            * gaussian(time_extended - last_history_year, approaching_time_1st)
+        last_history_idx = len(historic) - 1
+        slope_weights, kernel_0th, kernel_1st = gaussian_correction_kernels(
+            time=tuple(self.dims["t"].items),
+            last_history_idx=last_history_idx,
+            n=n,
+            approaching_time_0th=approaching_time_0th,
+            approaching_time_1st=approaching_time_1st,
+        )
+        # offset between historic and prediction at transition point
+        difference_0th = historic[last_history_idx, ...] - prediction[last_history_idx, ...]
+        # offset of the slopes of linear fits of the last n points before the transition point;
+        # since the slope is linear in the data, the slopes of both are not computed separately
+        window = slice(last_history_idx - n, last_history_idx)
+        difference_1st = np.tensordot(
+            slope_weights, historic[window, ...] - prediction[window, ...], axes=(0, 0)
         )
-        correction = corr0 + corr1
+
+        # kernels along the time axis, broadcast over all other dimensions
+        trailing_shape = (1,) * (prediction.ndim - 1)
+        correction = kernel_0th.reshape(-1, *trailing_shape) * difference_0th
+        correction += kernel_1st.reshape(-1, *trailing_shape) * difference_1st
 
         return prediction[...] + correction
+
+
+@functools.lru_cache(maxsize=32)
+def gaussian_correction_kernels(
+    time: tuple,
+    last_history_idx: int,
+    n: int,
+    approaching_time_0th: float,
+    approaching_time_1st: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Time-dependent factors of the Gaussian correction, which only depend on the time axis and
+    are therefore computed once and cached.
+    Returns:
+        slope_weights: Weights of the last n points before the last historic year, such that
+            their dot product with data is the slope of a least-squares linear fit.
+        kernel_0th: Factor of the offset between historic data and prediction.
+        kernel_1st: Factor of the offset between the slopes of historic data and prediction.
+    """
+    time = np.array(time, dtype=float)
+    last_history_year = time[last_history_idx]
+
+    x = time[last_history_idx - n : last_history_idx]
+    x_centered = x - x.mean()
+    slope_weights = x_centered / np.sum(x_centered**2)
+
+    def gaussian(t, approaching_time):
+        """After the approaching time, the amplitude of the gaussian has decreased to 5%."""
+        a = np.sqrt(np.log(20))
+        return np.exp(-((a * t / approaching_time) ** 2))
+
+    t = time - last_history_year
+    kernel_0th = gaussian(t, approaching_time_0th)
+    # the slope offset is scaled by the step size to the last historic year
+    kernel_1st = (
+        t / (last_history_year - time[last_history_idx - 1]) * gaussian(t, approaching_time_1st)
+    )
+
+    for array in (slope_weights, kernel_0th, kernel_1st):
+        array.flags.writeable = False
+    return slope_weights, kernel_0th, kernel_1st
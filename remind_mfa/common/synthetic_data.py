@@ -0,0 +1,356 @@
+import os
+from typing import Callable, Optional
+import numpy as np
+import pandas as pd
+import flodym as fd
+from pydantic import PrivateAttr
+
+from remind_mfa.common.common_definition import RemindMFADefinition
+from remind_mfa.common.common_mappings import CommonDimensionFiles
+from remind_mfa.common.helpers import RemindMFABaseModel, ModelNames, prefix_from_module
+
+ValueFactory = Callable[["SyntheticDataGenerator", fd.DimensionSet], np.ndarray]
+"""Function returning the values of a synthetic parameter with the given dimensions."""
+
+
+def constant(value: float) -> ValueFactory:
+    return lambda gen, dims: np.full(dims.shape, value, dtype=float)
+
+
+def uniform(low: float, high: float) -> ValueFactory:
+    return lambda gen, dims: gen.rng.uniform(low, high, dims.shape)
+
+
+def binary() -> ValueFactory:
+    return lambda gen, dims: gen.rng.integers(0, 2, dims.shape).astype(float)
+
+
+def shares(letter: str) -> ValueFactory:
+    """Random positive values summing to one over the given dimension."""
+
+    def factory(gen: "SyntheticDataGenerator", dims: fd.DimensionSet) -> np.ndarray:
+        values = gen.rng.uniform(0.5, 1.5, dims.shape)
+        return values / values.sum(axis=dims.index(letter), keepdims=True)
+
+    return factory
+
+
+def increasing(low: float, high: float, letter: str) -> ValueFactory:
+    """Values increasing geometrically from low to high along the given dimension."""
+
+    def factory(gen: "SyntheticDataGenerator", dims: fd.DimensionSet) -> np.ndarray:
+        values = np.geomspace(low, high, dims[letter].len).reshape(gen.shape_along(dims, letter))
+        return np.broadcast_to(values, dims.shape).copy()
+
+    return factory
+
+
+def growing(start_low: float, start_high: float, growth_low: float, growth_high: float):
+    """Exponential growth over the time dimension, with random start values and growth rates."""
+
+    def factory(gen: "SyntheticDataGenerator", dims: fd.DimensionSet) -> np.ndarray:
+        time_letter = dims.letters[0]
+        years = np.array(dims[time_letter].items, dtype=float)
+        other_shape = dims.shape[1:]
+        start = gen.rng.uniform(start_low, start_high, other_shape)
+        growth = gen.rng.uniform(growth_low, growth_high, other_shape)
+        exponent = (years - years[0]).reshape((-1,) + (1,) * len(other_shape))
+        return start * (1.0 + growth) ** exponent
+
+    return factory
+
+
+def per_capita(scale: float) -> ValueFactory:
+    """
+    Historic flows following population and saturating with GDP per capita,
+    reaching `scale` per capita for high incomes. Extra dimensions are split by random shares.
+    """
+
+    def factory(gen: "SyntheticDataGenerator", dims: fd.DimensionSet) -> np.ndarray:
+        historic_years = {"t": dims["h"]}
+        population = gen.get_parameter("population")[historic_years]
+        gdppc = gen.get_parameter("gdppc")[historic_years]
+        regional_factor = gen.rng.uniform(0.7, 1.3, dims["r"].len)
+        flow = population * gdppc / (gdppc + 1e4) * scale
+        flow = flow.cast_to(dims).values * regional_factor.reshape(gen.shape_along(dims, "r"))
+        for letter in dims.letters:
+            if letter not in ("h", "r"):
+                flow = flow * shares(letter)(gen, dims)
+        return flow
+
+    return factory
+
+
+def fraction_of(name: str, low: float, high: float) -> ValueFactory:
+    """Random fraction of another parameter, summed or broadcast to the target dimensions."""
+
+    def factory(gen: "SyntheticDataGenerator", dims: fd.DimensionSet) -> np.ndarray:
+        base = gen.get_parameter(name)
+        common_letters = tuple(l for l in base.dims.letters if l in dims.letters)
+        base = base.sum_to(common_letters).cast_to(dims).values
+        return base * gen.rng.uniform(low, high, dims.shape)
+
+    return factory
+
+
+common_parameter_values = {
+    "population": growing(2e7, 2e8, 0.005, 0.015),
+    "gdppc": growing(800.0, 3000.0, 0.015, 0.025),
+}
+
+# order matters where parameters are derived from others
+model_parameter_values = {
+    ModelNames.CEMENT: {
+        "stock_type_split": shares("s"),
+        "cement_production": per_capita(0.5),
+        "cement_trade": fraction_of("cement_production", -0.05, 0.05),
+        "clinker_ratio": uniform(0.65, 0.85),
+        "use_lifetime_mean": uniform(40.0, 80.0),
+        "use_lifetime_rel_std": constant(0.3),
+        "cement_losses": constant(0.02),
+        "clinker_losses": constant(0.02),
+        "product_density": uniform(2.0, 2.4),
+        "product_application_split": shares("a"),
+        "product_material_split": shares("m"),
+        "product_material_application_transform": constant(1.0),
+        "product_cement_content": uniform(0.2, 0.4),
+        "stock_saturation_level": uniform(15.0, 30.0),
+        "industrialized_regions": binary(),
+        "clinker_cao_ratio": constant(0.65),
+        "cao_carbonation_share": uniform(0.5, 0.8),
+        "cao_emission_factor": constant(0.785),
+        "ckd_cao_ratio": constant(0.5),
+        "ckd_landfill_share": constant(0.5),
+        "carbonation_rate": uniform(1.0, 5.0),
+        "carbonation_rate_buried": uniform(0.5, 2.0),
+        "carbonation_rate_coating": constant(1.0),
+        "carbonation_rate_co2": constant(1.0),
+        "carbonation_rate_additives": constant(1.0),
+        "product_thickness": uniform(100.0, 300.0),
+        "waste_type_split": shares("w"),
+        "waste_size_share": shares("p"),
+        "waste_size_min": increasing(1.0, 100.0, "p"),
+        "waste_size_max": increasing(10.0, 1000.0, "p"),
+    },
+    ModelNames.STEEL: {
+        "forming_yield": constant(0.94),
+        "fabrication_yield": uniform(0.75, 0.9),
+        "recovery_rate": uniform(0.6, 0.9),
+        "lifetime_mean": uniform(10.0, 60.0),
+        "lifetime_std": fraction_of("lifetime_mean", 0.3, 0.3),
+        "sector_split_low": shares("g"),
+        "sector_split_medium": shares("g"),
+        "sector_split_high": shares("g"),
+        "secsplit_gdppc_low": constant(5e3),
+        "secsplit_gdppc_high": constant(2e4),
+        "scrap_in_bof_rate": constant(0.2),
+        "forming_loss_rate": constant(0.01),
+        "fabrication_losses": constant(0.01),
+        "production_loss_rate": constant(0.02),
+        "saturation_level_factor": uniform(0.8, 1.2),
+        "stock_growth_speed_factor": uniform(0.8, 1.2),
+        "production": per_capita(0.5),
+        "scrap_consumption": fraction_of("production", 0.2, 0.4),
+        "steel_imports": fraction_of("production", 0.05, 0.2),
+        "steel_exports": fraction_of("production", 0.05, 0.2),
+        "indirect_imports": fraction_of("production", 0.002, 0.01),
+        "indirect_exports": fraction_of("production", 0.002, 0.01),
+        "scrap_imports": fraction_of("production", 0.02, 0.1),
+        "scrap_exports": fraction_of("production", 0.02, 0.1),
+    },
+    ModelNames.PLASTICS: {
+        "consumption": per_capita(0.1),
+        "collection_rate": uniform(0.3, 0.9),
+        "mechanical_recycling_rate": uniform(0.05, 0.2),
+        "chemical_recycling_rate": uniform(0.0, 0.02),
+        "incineration_rate": uniform(0.1, 0.4),
+        "primary_his_imports": fraction_of("consumption", 0.05, 0.2),
+        "primary_his_exports": fraction_of("consumption", 0.05, 0.2),
+        "intermediate_his_imports": fraction_of("consumption", 0.02, 0.1),
+        "intermediate_his_exports": fraction_of("consumption", 0.02, 0.1),
+        "manufactured_his_imports": fraction_of("consumption", 0.02, 0.1),
+        "manufactured_his_exports": fraction_of("consumption", 0.02, 0.1),
+        "final_his_imports": fraction_of("consumption", 0.02, 0.1),
+        "final_his_exports": fraction_of("consumption", 0.02, 0.1),
+        "waste_imports": uniform(1e4, 1e5),
+        "waste_exports": uniform(1e4, 1e5),
+        "bio_production_rate": uniform(0.0, 0.02),
+        "daccu_production_rate": uniform(0.0, 0.001),
+        "mechanical_recycling_yield": uniform(0.7, 0.9),
+        "reclmech_loss_uncontrolled_rate": uniform(0.0, 0.05),
+        "material_shares_in_goods": shares("m"),
+        "emission_capture_rate": constant(0.0),
+        "carbon_content_materials": shares("e"),
+        "lifetime_mean": uniform(2.0, 20.0),
+        "lifetime_std": fraction_of("lifetime_mean", 0.3, 0.3),
+    },
+}
+
+# items referred to by name in the model code are always included
+default_dimension_items = {
+    "Stock Type": ["Residential", "Non-residential", "Civil engineering"],
+    "Product Material": ["concrete", "mortar"],
+    "Product Application": ["structural", "masonry", "other"],
+    "Waste Type": ["new concrete", "recycled aggregates", "landfill"],
+    "Waste Size": ["fine", "medium", "coarse"],
+    "Carbonation Location": ["CKD", "Construction Waste", "In-Use Stock", "End-of-Life Stock"],
+    "Element": ["C", "Other Elements"],
+    "Material": ["PE", "PP", "PVC", "PS", "PET", "Other"],
+}
+default_good_items = {
+    ModelNames.STEEL: ["Construction", "Machinery", "Products", "Transport"],
+    ModelNames.PLASTICS: [
+        "Packaging",
+        "Construction",
+        "Transportation",
+        "Electrical",
+        "Textiles",
+        "Other",
+    ],
+}
+
+
+class SyntheticDataGenerator(RemindMFABaseModel):
+    """
+    Writes random but plausible input data for one model in the layout expected by
+    CommonDataReader: dimension files, a regionmapping and one .cs4r file per parameter,
+    together with a version file such that no tgz extraction is attempted.
+    Region, time and good dimensions can be scaled to test the performance of the models.
+    """
+
+    model: ModelNames
+    """Model to generate input data for."""
+    definition: RemindMFADefinition
+    """Definition of the model, from which dimensions and parameters are taken."""
+    dimension_files: CommonDimensionFiles
+    """Mapping of dimension names to file names of the model."""
+    input_data_path: str
+    """Path to the input data directory, as in the input config."""
+    input_data_version: str = "synthetic"
+    """Version written to the version file, which must match the input config."""
+    n_regions: int = 12
+    """Number of regions."""
+    n_goods: Optional[int] = None
+    """Number of goods. If None, the default goods of the model are used."""
+    first_year: int = 1900
+    """First historic and future year."""
+    last_historic_year: int = 2022
+    """Last year of the historic time dimension."""
+    last_year: int = 2100
+    """Last year of the time dimension."""
+    countries_per_region: int = 3
+    """Number of countries per region in the regionmapping."""
+    seed: int = 0
+    """Seed of the random number generator."""
+
+    _rng: np.random.Generator = PrivateAttr()
+    _dims: fd.DimensionSet = PrivateAttr()
+    _parameters: dict[str, fd.FlodymArray] = PrivateAttr(default_factory=dict)
+
+    @property
+    def rng(self) -> np.random.Generator:
+        return self._rng
+
+    @property
+    def material_path(self) -> str:
+        return os.path.join(self.input_data_path, self.model.value)
+
+    @property
+    def parameter_path(self) -> str:
+        return os.path.join(self.material_path, "input_data")
+
+    @property
+    def dimension_path(self) -> str:
+        return os.path.join(self.material_path, "dimensions")
+
+    def generate(self):
+        self._rng = np.random.default_rng(self.seed)
+        self._parameters = {}
+        os.makedirs(self.parameter_path, exist_ok=True)
+        os.makedirs(self.dimension_path, exist_ok=True)
+
+        self._dims = fd.DimensionSet(
+            dim_list=[
+                fd.Dimension(name=d.name, letter=d.letter, items=self.dimension_items(d.name))
+                for d in self.definition.dimensions
+            ]
+        )
+        self.write_dimensions()
+        self.write_parameters()
+        with open(os.path.join(self.parameter_path, "version.txt"), "w") as f:
+            f.write(self.input_data_version)
+
+    def dimension_items(self, name: str) -> list:
+        if name == "Time":
+            return list(range(self.first_year, self.last_year + 1))
+        if name == "Historic Time":
+            return list(range(self.first_year, self.last_historic_year + 1))
+        if name == "Region":
+            return [f"R{i + 1:02d}" for i in range(self.n_regions)]
+        if name == "Good":
+            items = default_good_items[self.model]
+            if self.n_goods is None:
+                return items
+            extra_items = [f"Good {i + 1}" for i in range(len(items), self.n_goods)]
+            return (items + extra_items)[: self.n_goods]
+        return default_dimension_items[name]
+
+    def write_dimensions(self):
+        for dim in self._dims:
+            if dim.name == "Region":
+                self.write_regionmapping(dim)
+            else:
+                filename = os.path.join(
+                    self.dimension_path, f"{self.dimension_files[dim.name]}.csv"
+                )
+                pd.Series(dim.items).to_csv(filename, index=False, header=False)
+
+    def write_regionmapping(self, regions: fd.Dimension):
+        region_codes = np.repeat(regions.items, self.countries_per_region)
+        df = pd.DataFrame(
+            {
+                "CountryCode": [f"C{i + 1:03d}" for i in range(len(region_codes))],
+                "RegionCode": region_codes,
+            }
+        )
+        df.to_csv(
+            os.path.join(self.parameter_path, "regionmapping_synthetic.csv"), sep=";", index=False
+        )
+
+    def write_parameters(self):
+        value_factories = common_parameter_values | model_parameter_values[self.model]
+        definitions = {p.name: p for p in self.definition.parameters}
+        missing = set(definitions) - set(value_factories)
+        if missing:
+            raise ValueError(f"No synthetic values defined for parameters: {sorted(missing)}")
+        prefix = prefix_from_module(self.model.value)
+        for name, factory in value_factories.items():
+            if name not in definitions:
+                continue
+            dims = self._dims[definitions[name].dim_letters]
+            parameter = fd.FlodymArray(dims=dims, values=factory(self, dims), name=name)
+            self._parameters[name] = parameter
+            self.write_cs4r(os.path.join(self.parameter_path, f"{prefix}_{name}.cs4r"), parameter)
+
+    def get_parameter(self, name: str) -> fd.FlodymArray:
+        """Returns a parameter generated before, to derive others from it."""
+        return self._parameters[name]
+
+    def shape_along(self, dims: fd.DimensionSet, letter: str) -> tuple[int, ...]:
+        """Shape for broadcasting a one-dimensional array along the given dimension."""
+        shape = [1] * dims.ndim
+        shape[dims.index(letter)] = dims[letter].len
+        return tuple(shape)
+
+    @staticmethod
+    def write_cs4r(filename: str, parameter: fd.FlodymArray):
+        """Writes a parameter in long format with a madrat-style header."""
+        columns = list(parameter.dims.names) + ["value"]
+        if parameter.dims.ndim > 0:
+            df = parameter.to_df().reset_index()
+        else:
+            df = pd.DataFrame({"value": [parameter.values.item()]})
+        with open(filename, "w") as f:
+            f.write(f"* description: synthetic data for {parameter.name}\n")
+            f.write(f"* dimensions: ({', '.join(columns)})\n")
+            df.to_csv(f, index=False, header=False, float_format="%.17g")
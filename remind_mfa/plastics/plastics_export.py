@@ -1,6 +1,5 @@
 import flodym as fd
 import pandas as pd
-import pyam
 from typing import TYPE_CHECKING
 
 from remind_mfa.common.common_export import CommonDataExporter
@@ -55,6 +54,7 @@ class PlasticsDataExporter(CommonDataExporter):
         df.to_csv(self.export_path("csv", "recycling_by_region_year.csv"), index=True)
 
     def write_iamc(self, mfa: fd.MFASystem):
+        import pyam
 
         model = "REMIND 3.0"
         scenario = "SSP2_NPi"
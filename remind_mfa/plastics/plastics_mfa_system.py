@@ -5,6 +5,8 @@ from remind_mfa.common.trade import TradeSet, Trade
 from remind_mfa.common.trade_extrapolation import extrapolate_trade
 from remind_mfa.plastics.plastics_config import PlasticsCfg
 from remind_mfa.plastics.plastics_config import PlasticsCfg
+from remind_mfa.common.profiling import profiled
+from remind_mfa.common.monte_carlo import sample_letters
 
 
 class PlasticsMFASystemFuture(fd.MFASystem):
@@ -22,6 +24,7 @@ class PlasticsMFASystemFuture(fd.MFASystem):
         self.check_mass_balance()
         self.check_flows(raise_error=False)
 
+    @profiled
     def compute_waste_trade(self):
 
         split_eol = self.stocks["in_use"].outflow.get_shares_over(("g", "e", "m"))
@@ -29,6 +32,7 @@ class PlasticsMFASystemFuture(fd.MFASystem):
         self.trade_set["waste"].exports[...] = self.parameters[f"waste_exports"] * split_eol
         self.trade_set.balance(to="maximum")
 
+    @profiled
     def compute_stock(self, stock_projection: fd.FlodymArray):
         self.stocks["in_use_dsm"].stock[...] = stock_projection
         self.stocks["in_use_dsm"].lifetime_model.set_prms(
@@ -52,6 +56,7 @@ class PlasticsMFASystemFuture(fd.MFASystem):
             exports=trade.exports * share[{"t": self.dims["h"]}],
         )
 
+    @profiled
     def compute_flows(self, historic_trade: TradeSet):
 
         # abbreviations for better readability
@@ -59,13 +64,16 @@ class PlasticsMFASystemFuture(fd.MFASystem):
         flw = self.flows
         stk = self.stocks
         trd = self.trade_set
+        smp = sample_letters(self.dims)
 
         aux = {
-            "reclmech_loss": self.get_new_array(dim_letters=("t", "e", "r", "m")),
-            "virgin_2_fabr_all_mat": self.get_new_array(dim_letters=("t", "e", "r")),
-            "virgin_material_shares": self.get_new_array(dim_letters=("t", "e", "r", "m")),
-            "captured_2_virginccu_by_mat": self.get_new_array(dim_letters=("t", "e", "r", "m")),
-            "ratio_nonc_to_c": self.get_new_array(dim_letters=("m",)),
+            "reclmech_loss": self.get_new_array(dim_letters=("t", "e", "r", "m") + smp),
+            "virgin_2_fabr_all_mat": self.get_new_array(dim_letters=("t", "e", "r") + smp),
+            "virgin_material_shares": self.get_new_array(dim_letters=("t", "e", "r", "m") + smp),
+            "captured_2_virginccu_by_mat": self.get_new_array(
+                dim_letters=("t", "e", "r", "m") + smp
+            ),
+            "ratio_nonc_to_c": self.get_new_array(dim_letters=("m",) + smp),
         }
 
         split_use = stk["in_use"].inflow.get_shares_over(("g", "e", "m"))
@@ -209,6 +217,7 @@ class PlasticsMFASystemFuture(fd.MFASystem):
 
         # fmt: on
 
+    @profiled
     def compute_other_stocks(self):
 
         stk = self.stocks
@@ -1,6 +1,7 @@
 import flodym as fd
 
 from remind_mfa.plastics.plastics_config import PlasticsCfg
+from remind_mfa.common.profiling import profiled
 
 
 class PlasticsMFASystemHistoric(fd.MFASystem):
@@ -17,6 +18,7 @@ class PlasticsMFASystemHistoric(fd.MFASystem):
         # self.check_mass_balance()
         # self.check_flows(no_error=True)
 
+    @profiled
     def compute_historic_stock(self):
         self.stocks["in_use_historic"].inflow[...] = self.parameters["consumption"]
         self.stocks["in_use_historic"].lifetime_model.set_prms(
@@ -24,6 +26,7 @@ class PlasticsMFASystemHistoric(fd.MFASystem):
         )
         self.stocks["in_use_historic"].compute()
 
+    @profiled
     def compute_trade(self):
 
         for name, trade in self.trade_set.markets.items():
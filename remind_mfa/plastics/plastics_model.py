@@ -12,6 +12,7 @@ from remind_mfa.plastics.plastics_config import PlasticsCfg
 from remind_mfa.common.common_model import CommonModel
 from remind_mfa.common.assumptions_doc import add_assumption_doc
 from remind_mfa.common.stock_extrapolation import StockExtrapolation
+from remind_mfa.common.monte_carlo import sample_letters
 from remind_mfa.common.data_transformations import Bound, BoundList
 
 
@@ -49,7 +50,7 @@ class PlasticsModel(CommonModel):
         historic_pop = self.parameters["population"][{"t": self.dims["h"]}]
         stock_pc = historic_stock.stock / historic_pop
         # First extrapolation to get global saturation levels
-        indep_fit_dim_letters = ("g",)
+        indep_fit_dim_letters = ("g",) + sample_letters(self.dims)
         lower_bound = fd.FlodymArray(
             dims=self.dims[indep_fit_dim_letters],
             values=np.zeros(self.dims[indep_fit_dim_letters].shape),
@@ -83,7 +84,7 @@ class PlasticsModel(CommonModel):
         )
         # Second extrapolation per region and good, using the maximum of the previously fitted global saturation level
         # and the maximum historic stock per capita in the respective region as upper bound
-        indep_fit_dim_letters = ("r", "g")
+        indep_fit_dim_letters = ("r", "g") + sample_letters(self.dims)
         saturation_level = stock_handler.pure_parameters["saturation_level"].cast_to(
             self.dims[indep_fit_dim_letters]
         )
@@ -2,17 +2,8 @@ import flodym as fd
 import numpy as np
 import pandas as pd
 
-from plotly import colors as plc
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
-import pyam
 from typing import TYPE_CHECKING
-import flodym.export as fde
 from typing import Any, List, Optional
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.colors as pc
-
 
 from remind_mfa.common.common_visualization import CommonVisualizer
 
@@ -230,6 +221,7 @@ class PlasticsVisualizer(CommonVisualizer):
         super().visualize_use_stock(mfa, stock=mfa.stocks["in_use"].stock, subplot_dim=subplot_dim)
 
     def visualize_stock(self, mfa: fd.MFASystem, subplots_by_good=False):
+        from plotly import colors as plc
 
         stock = mfa.stocks["in_use"].stock.sum_over(("r", "m", "e"))
         good_dim = stock.dims.index("g")
@@ -342,6 +334,9 @@ class PlasticsVisualizer(CommonVisualizer):
         )
 
     def visualize_sankey(self, mfa: fd.MFASystem):
+        import plotly.graph_objects as go
+        import flodym.export as fde
+
         # Define colors for each stage
         production_color = "#EDC948"
         use_color = "#9EC3D5"
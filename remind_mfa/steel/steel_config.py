@@ -1,4 +1,23 @@
-from remind_mfa.common.common_config import CommonCfg, VisualizationCfg, BaseVisualizationCfg
+from remind_mfa.common.common_config import (
+    CommonCfg,
+    ModelSwitches,
+    VisualizationCfg,
+    BaseVisualizationCfg,
+)
+from remind_mfa.common.price_driven_trade import TradeSolvers, CalibrationSolvers
+
+
+class SteelModelSwitches(ModelSwitches):
+    trade_solver: TradeSolvers = TradeSolvers.FIXED_POINT
+    """Solver for the market equilibrium of the price elastic trade."""
+    trade_calibration_solver: CalibrationSolvers = CalibrationSolvers.FIXED_POINT
+    """Solver for the calibration of the price elastic trade to historic trade."""
+    trade_calibration_years: list[int] = [2022]
+    """Historic years to calibrate the price elastic trade to, jointly if there are several."""
+    trade_per_year: bool = False
+    """Solve the price elastic trade for each year separately instead of all years at once."""
+    trade_n_workers: int = 1
+    """Number of threads for per-year solving of the price elastic trade."""
 
 
 class GDPVisualizationCfg(BaseVisualizationCfg):
@@ -21,5 +40,8 @@ class SteelVisualizationCfg(VisualizationCfg):
 
 class SteelCfg(CommonCfg):
 
+    model_switches: SteelModelSwitches
+    """Steel model switches."""
+
     visualization: SteelVisualizationCfg
     """Steel visualization configuration."""
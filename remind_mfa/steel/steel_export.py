@@ -1,4 +1,3 @@
-import pyam
 import flodym as fd
 
 from remind_mfa.common.common_export import CommonDataExporter
@@ -7,6 +6,7 @@ from remind_mfa.common.common_export import CommonDataExporter
 class SteelDataExporter(CommonDataExporter):
 
     def write_iamc(self, mfa: fd.MFASystem):
+        import pyam
 
         model = "REMIND 3.0"
         scenario = "SSP2_NPi"
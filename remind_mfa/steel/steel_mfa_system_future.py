@@ -7,6 +7,8 @@ from remind_mfa.common.trade_extrapolation import extrapolate_trade
 from remind_mfa.common.price_driven_trade import PriceDrivenTrade
 from remind_mfa.common.common_mfa_system import CommonMFASystem
 from remind_mfa.steel.steel_config import SteelCfg
+from remind_mfa.common.profiling import profiled
+from remind_mfa.common.monte_carlo import sample_letters
 
 
 class SteelMFASystem(CommonMFASystem):
@@ -26,7 +28,9 @@ class SteelMFASystem(CommonMFASystem):
         # self.update_price_elastic()
 
     def update_price_elastic(self):
-        self.compute_price_elastic_trade()
+        self.compute_price_elastic_trade(
+            calibration_years=tuple(self.cfg.model_switches.trade_calibration_years)
+        )
         # self.compute_consumption()
         # self.compute_in_use_stock() # ensure inflow-driven
         # self.compute_other_flows()
@@ -35,22 +39,45 @@ class SteelMFASystem(CommonMFASystem):
         # self.check_mass_balance()
         # self.check_flows(raise_error=False)
 
-    def compute_price_elastic_trade(self):
+    @profiled
+    def compute_price_elastic_trade(self, calibration_years: tuple[int, ...] = (2022,)):
+        """
+        Price elastic trade, calibrated to the historic trade in calibration_years.
+        For several calibration years, one parameter set is fitted to all of them jointly.
+        """
+        if len(calibration_years) == 1:
+            calibration = calibration_years[0]
+        else:
+            calibration_dim = fd.Dimension(
+                name="Calibration Time", letter="T", items=list(calibration_years), dtype=int
+            )
+            calibration = {"t": calibration_dim}
+
         price = fd.FlodymArray(dims=self.dims["t", "r"])
         price[...] = 500.0
         # price.values[131:201,2] = np.minimum(800., np.linspace(500, 2000, 70))
-        model = PriceDrivenTrade(dims=self.trade_set["steel"].exports.dims)
+        model = PriceDrivenTrade(
+            dims=self.trade_set["steel"].exports.dims,
+            solver=self.cfg.model_switches.trade_solver,
+            calibration_solver=self.cfg.model_switches.trade_calibration_solver,
+            per_year=self.cfg.model_switches.trade_per_year,
+            n_workers=self.cfg.model_switches.trade_n_workers,
+        )
         model.calibrate(
-            demand=self.flows["ip_market => fabrication"][2022],
-            price=price[2022],
-            imports_target=self.trade_set["steel"].imports[2022],
-            exports_target=self.trade_set["steel"].exports[2022],
+            demand=self.flows["ip_market => fabrication"][calibration],
+            price=price[calibration],
+            imports_target=self.trade_set["steel"].imports[calibration],
+            exports_target=self.trade_set["steel"].exports[calibration],
         )
         price, demand, supply, imports, exports = model.compute_price_driven_trade(
             price_0=price,
             demand_0=self.flows["ip_market => fabrication"],
             supply_0=self.flows["forming => ip_market"],
         )
+        logging.info(
+            f"Price driven trade converged after {model.diagnostics.n_iter} iterations "
+            f"(max. relative error {model.diagnostics.residuals[-1]:.2e})"
+        )
 
         self.flows["ip_market => fabrication"][...] = demand
         self.flows["forming => ip_market"][...] = supply
@@ -61,6 +88,7 @@ class SteelMFASystem(CommonMFASystem):
         self.flows["imports => ip_market"][...] = self.trade_set["steel"].imports
         self.flows["ip_market => exports"][...] = self.trade_set["steel"].exports
 
+    @profiled
     def compute_in_use_stock(self, stock_projection):
         self.stocks["in_use"].stock[...] = stock_projection
         self.stocks["in_use"].lifetime_model.set_prms(
@@ -76,6 +104,7 @@ class SteelMFASystem(CommonMFASystem):
             ]
             logging.warning(f"In-use stock inflow <0 in regions {negative_regions}!")
 
+    @profiled
     def extrapolate_trade_set(self, historic_trade: TradeSet):
         product_demand = self.stocks["in_use"].inflow
         extrapolate_trade(
@@ -110,23 +139,25 @@ class SteelMFASystem(CommonMFASystem):
         self.trade_set["scrap"].exports[...] = self.trade_set["scrap"].exports.minimum(eol_products)
         self.trade_set["scrap"].balance(to="minimum")
 
+    @profiled
     def compute_flows(self):
         # abbreviations for better readability
         prm = self.parameters
         flw = self.flows
         stk = self.stocks
         trd = self.trade_set
+        smp = sample_letters(self.dims)
 
         aux = {
-            "net_scrap_trade": self.get_new_array(dim_letters=("t", "r", "g")),
-            "production": self.get_new_array(dim_letters=("t", "r")),
-            "scrap_in_production": self.get_new_array(dim_letters=("t", "r")),
-            "available_scrap": self.get_new_array(dim_letters=("t", "r")),
-            "eaf_share_production": self.get_new_array(dim_letters=("t", "r")),
-            "production_inflow": self.get_new_array(dim_letters=("t", "r")),
-            "max_scrap_production": self.get_new_array(dim_letters=("t", "r")),
-            "scrap_share_production": self.get_new_array(dim_letters=("t", "r")),
-            "bof_production_inflow": self.get_new_array(dim_letters=("t", "r")),
+            "net_scrap_trade": self.get_new_array(dim_letters=("t", "r", "g") + smp),
+            "production": self.get_new_array(dim_letters=("t", "r") + smp),
+            "scrap_in_production": self.get_new_array(dim_letters=("t", "r") + smp),
+            "available_scrap": self.get_new_array(dim_letters=("t", "r") + smp),
+            "eaf_share_production": self.get_new_array(dim_letters=("t", "r") + smp),
+            "production_inflow": self.get_new_array(dim_letters=("t", "r") + smp),
+            "max_scrap_production": self.get_new_array(dim_letters=("t", "r") + smp),
+            "scrap_share_production": self.get_new_array(dim_letters=("t", "r") + smp),
+            "bof_production_inflow": self.get_new_array(dim_letters=("t", "r") + smp),
         }
 
         # fmt: off
@@ -196,6 +227,7 @@ class SteelMFASystem(CommonMFASystem):
         flw["sysenv => extraction"][...] = flw["extraction => bof_production"]
         # fmt: on
 
+    @profiled
     def compute_other_stocks(self):
         stk = self.stocks
         flw = self.flows
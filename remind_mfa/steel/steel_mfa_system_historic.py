@@ -6,6 +6,8 @@ from remind_mfa.common.data_blending import blend
 from remind_mfa.common.assumptions_doc import add_assumption_doc
 from remind_mfa.common.common_mfa_system import CommonMFASystem
 from remind_mfa.steel.steel_config import SteelCfg
+from remind_mfa.common.profiling import profiled
+from remind_mfa.common.monte_carlo import sample_letters
 
 
 class SteelMFASystemHistoric(CommonMFASystem):
@@ -24,14 +26,16 @@ class SteelMFASystemHistoric(CommonMFASystem):
         self.check_mass_balance()
         self.check_flows(raise_error=False)
 
+    @profiled
     def compute_flows(self):
         prm = self.parameters
         flw = self.flows
         trd = self.trade_set
+        smp = sample_letters(self.dims)
 
         aux = {
-            "aggregate_fabrication_yield": self.get_new_array(dim_letters=("h", "r")),
-            "fabrication_to_good_market_total": self.get_new_array(dim_letters=("h", "r")),
+            "aggregate_fabrication_yield": self.get_new_array(dim_letters=("h", "r") + smp),
+            "fabrication_to_good_market_total": self.get_new_array(dim_letters=("h", "r") + smp),
         }
 
         # fmt: off
@@ -100,9 +104,10 @@ class SteelMFASystemHistoric(CommonMFASystem):
         # fmt: on
         return min_imports + fabrication_domestic
 
+    @profiled
     def calc_sector_split(self) -> fd.FlodymArray:
         """Blend over GDP per capita between typical sector splits for low and high GDP per capita regions."""
-        target_dims = self.dims["h", "r", "g"]
+        target_dims = self.dims[("h", "r", "g") + sample_letters(self.dims)]
         self.parameters["sector_split"] = fd.Parameter(dims=target_dims, name="sector_split")
         sector_split_1 = fd.Parameter(dims=target_dims)
         sector_split_2 = fd.Parameter(dims=target_dims)
@@ -146,6 +151,7 @@ class SteelMFASystemHistoric(CommonMFASystem):
         )
         return
 
+    @profiled
     def compute_in_use_stock(self):
         flw = self.flows
         stk = self.stocks
@@ -14,6 +14,7 @@ from remind_mfa.steel.steel_mappings import SteelDimensionFiles, SteelDisplayNam
 from remind_mfa.steel.steel_visualization import SteelVisualizer
 from remind_mfa.common.assumptions_doc import add_assumption_doc
 from remind_mfa.common.common_model import CommonModel
+from remind_mfa.common.monte_carlo import SAMPLE_DIM_LETTER, sample_letters
 from remind_mfa.steel.steel_definition import scenario_parameters as steel_scn_prm_def
 
 
@@ -28,6 +29,15 @@ class SteelModel(CommonModel):
     FutureMFASystemCls = SteelMFASystem
     get_definition = staticmethod(get_steel_definition)
     custom_scn_prm_def = steel_scn_prm_def
+    stock_projection_parameters = (
+        "gdppc",
+        "population",
+        "saturation_level_factor",
+        "stock_growth_speed_factor",
+        "lifetime_mean",
+        "sector_split_high",
+        "sector_split_low",
+    )
 
     def modify_parameters(self):
         """Manual changes to parameters in order to match historical scrap consumption."""
@@ -106,7 +116,7 @@ class SteelModel(CommonModel):
     def get_long_term_stock(self) -> fd.FlodymArray:
         indep_fit_dim_letters = (
             ("g",) if self.cfg.model_switches.do_stock_extrapolation_by_category else ()
-        )
+        ) + sample_letters(self.dims)
         historic_stocks = self.historic_mfa.stocks["historic_in_use"].stock
         sat_level = self.get_saturation_level(historic_stocks)
         sat_bound = Bound(
@@ -180,13 +190,19 @@ class SteelModel(CommonModel):
         historic_pop = pop[{"t": self.dims["h"]}]
         historic_stocks_pc = historic_stocks.sum_over("g") / historic_pop
 
+        # Monte Carlo samples are fitted separately
+        sample_idx = tuple(
+            i for i, l in enumerate(historic_stocks_pc.dims.letters) if l == SAMPLE_DIM_LETTER
+        )
         multi_dim_extrapolation = self.cfg.model_switches.stock_extrapolation_class(
             data_to_extrapolate=historic_stocks_pc.values,
-            predictor_values=np.log10(gdppc.values),
-            independent_dims=(),
+            predictor_values=np.log10(
+                gdppc.cast_values_to(self.dims[("t",) + historic_stocks_pc.dims.letters[1:]])
+            ),
+            independent_dims=sample_idx,
         )
         multi_dim_extrapolation.regress()
-        saturation_level = multi_dim_extrapolation.fit_prms[0]
+        saturation_level = multi_dim_extrapolation.fit_prms[..., 0]
 
         if self.cfg.model_switches.do_stock_extrapolation_by_category:
             high_stock_sector_split = self.get_high_stock_sector_split()
@@ -220,8 +236,9 @@ class SteelModel(CommonModel):
         ].stock.get_shares_over("g")
         prm = self.parameters
         sector_split_high = self.get_high_stock_sector_split()
+        target_dims = self.dims[("t", "r", "g") + sample_letters(self.dims)]
         sector_split_theory = blend(
-            target_dims=self.dims["t", "r", "g"],
+            target_dims=target_dims,
             y_lower=prm["sector_split_low"],
             y_upper=sector_split_high,
             x=prm["gdppc"].apply(np.log),
@@ -229,10 +246,10 @@ class SteelModel(CommonModel):
             x_upper=float(np.log(100000)),
         )
         last_historical = historical_sector_splits[{"h": self.dims["h"].items[-1]}]
-        historical_extrapolated = last_historical.cast_to(self.dims["t", "r", "g"])
+        historical_extrapolated = last_historical.cast_to(target_dims)
         historical_extrapolated[{"t": self.dims["h"]}] = historical_sector_splits
         sector_splits = blend(
-            target_dims=self.dims["t", "r", "g"],
+            target_dims=target_dims,
             y_lower=historical_extrapolated,
             y_upper=sector_split_theory,
             x="t",
@@ -1,11 +1,7 @@
 import numpy as np
 import os
-from plotly import colors as plc
-import plotly.graph_objects as go
-import pyam
 import flodym as fd
 from typing import TYPE_CHECKING
-import flodym.export as fde
 
 from remind_mfa.common.common_visualization import CommonVisualizer
 from remind_mfa.steel.steel_config import SteelVisualizationCfg
@@ -39,6 +35,8 @@ class SteelVisualizer(CommonVisualizer):
         self.stop_and_show()
 
     def visualize_trade(self, mfa: fd.MFASystem):
+        from plotly import colors as plc
+
         linecolor_dims = {
             "steel": None,
             "indirect": "Good",
@@ -119,6 +117,9 @@ class SteelVisualizer(CommonVisualizer):
             self.plot_and_save_figure(ap, "gdppc.png", do_plot=False)
 
     def visualize_sankey(self, mfa: fd.MFASystem):
+        import plotly.graph_objects as go
+        import flodym.export as fde
+
         good_colors = [f"hsl({190 + 10 *i},40,{77-5*i})" for i in range(4)]
         production_color = "hsl(50,40,70)"
         scrap_color = "hsl(120,40,70)"
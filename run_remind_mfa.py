@@ -2,11 +2,9 @@ import logging
 import yaml
 import sys
 
-from remind_mfa.common.helpers import ModelNames
+from remind_mfa.common.helpers import ModelNames, get_model_class
 from remind_mfa.common.common_model import CommonModel
-from remind_mfa.cement.cement_model import CementModel
-from remind_mfa.plastics.plastics_model import PlasticsModel
-from remind_mfa.steel.steel_model import SteelModel
+from remind_mfa.common.model_server import ModelServer
 
 
 def run_remind_mfa(cfg_file: str):
@@ -20,6 +18,48 @@ def run_remind_mfa(cfg_file: str):
     logging.info("Export completed.")
     model.visualize()
     logging.info("Visualization completed.")
+    model.write_profile()
+
+
+def run_remind_mfa_scenarios(cfg_file: str, scenarios: list[str]):
+    """
+    Runs several scenarios for one config.
+    Data reading, the historic MFA and the stock projection are computed only once.
+    If enabled, the Monte Carlo run is performed for each scenario, re-running all computations per sample.
+    Results are written to one sub-directory per scenario.
+    """
+    configure_logger()
+    model_config = read_model_config(cfg_file)
+    model = init_model(cfg=model_config)
+    logging.info(f"{type(model).__name__} instance created.")
+    model.run_historic()
+    logging.info("Scenario-independent computations completed.")
+    for scenario in scenarios:
+        scenario_model = model.for_scenario(scenario)
+        if scenario_model.cfg.monte_carlo.do_monte_carlo:
+            scenario_model.run_monte_carlo()
+            logging.info(f"Monte Carlo run for scenario {scenario} completed.")
+        scenario_model.run_future()
+        logging.info(f"Model computations for scenario {scenario} completed.")
+        scenario_model.export()
+        logging.info(f"Export for scenario {scenario} completed.")
+        scenario_model.visualize()
+        logging.info(f"Visualization for scenario {scenario} completed.")
+        scenario_model.write_profile()
+
+
+def serve_remind_mfa(cfg_file: str, port: int = 8765):
+    """
+    Keeps the model in memory and re-runs the future MFA with updated parameters on request,
+    e.g. for coupled iterations with other models. See ModelServer for the endpoints.
+    """
+    configure_logger()
+    model_config = read_model_config(cfg_file)
+    model = init_model(cfg=model_config)
+    logging.info(f"{type(model).__name__} instance created.")
+    server = ModelServer(model)
+    logging.info("Scenario-independent computations and baseline run completed.")
+    server.serve(port=port)
 
 
 def configure_logger():
@@ -43,13 +83,8 @@ def init_model(cfg: dict) -> CommonModel:
     if "model" not in cfg:
         raise ValueError("'model' must be given.")
     model_name = ModelNames(cfg["model"])
-
-    models = {
-        ModelNames.PLASTICS: PlasticsModel,
-        ModelNames.STEEL: SteelModel,
-        ModelNames.CEMENT: CementModel,
-    }
-    return models[model_name](cfg=cfg)
+    model_cls = get_model_class(model_name)
+    return model_cls(cfg=cfg)
 
 
 if __name__ == "__main__":
@@ -57,4 +92,11 @@ if __name__ == "__main__":
         cfg_file = sys.argv[1]
     except IndexError:
         raise ValueError("Please provide a configuration file as an argument.")
-    run_remind_mfa(cfg_file)
+    scenarios = sys.argv[2:]
+    if scenarios[:1] == ["--serve"]:
+        port = int(scenarios[1]) if len(scenarios) > 1 else 8765
+        serve_remind_mfa(cfg_file, port)
+    elif scenarios:
+        run_remind_mfa_scenarios(cfg_file, scenarios)
+    else:
+        run_remind_mfa(cfg_file)
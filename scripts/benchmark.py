@@ -0,0 +1,161 @@
+"""
+Benchmarks the models on synthetic input data, such that no madrat output is needed.
+
+For each model and number of regions, synthetic data is generated and the model is run with
+profiling enabled. The timings of all stages (imports, model init, historic MFA, stock
+extrapolation, future MFA, cement carbonation, export, ...) are written to a CSV file and
+summarized as the best of all repetitions.
+The import time is measured with `python -X importtime` in a fresh interpreter, such that it is
+not affected by modules imported earlier.
+
+Example:
+    python scripts/benchmark.py --models steel cement --regions 12 32 --repeat 3
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+import logging
+import tempfile
+import pandas as pd
+import yaml
+
+from remind_mfa.common.helpers import ModelNames, get_model_class
+from remind_mfa.common.profiling import StageProfiler
+from remind_mfa.common.synthetic_data import SyntheticDataGenerator
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def benchmark_config(model_name: ModelNames, base_path: str, config_path: str) -> dict:
+    """Model config from the config folder, redirected to synthetic data and temporary output."""
+    with open(os.path.join(config_path, f"{model_name.value}.yml"), "r") as stream:
+        cfg = yaml.safe_load(stream)
+    cfg["input"].update(
+        madrat_output_path=base_path,
+        input_data_path=os.path.join(base_path, "input"),
+        input_data_version="synthetic",
+        force_extract_tgz=False,
+        selective_extraction=False,
+        scenarios_path=os.path.join(config_path, "scenarios"),
+    )
+    cfg["export"]["path"] = os.path.join(base_path, "export")
+    cfg["export"]["docs"]["do_export"] = False
+    cfg["visualization"]["do_visualize"] = False
+    cfg["profiling"] = {"do_profile": True}
+    if model_name == ModelNames.CEMENT:
+        cfg["model_switches"]["mode"] = "carbon_flow"
+    return cfg
+
+
+def import_time(modules: list[str]) -> float:
+    """
+    Time in seconds to import the modules in a fresh interpreter, as reported by -X importtime.
+    The interpreter is started in the repository root, such that run_remind_mfa can be imported.
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=REPO_ROOT,
+    )
+    total_us = 0
+    for line in result.stderr.splitlines():
+        # format: 'import time: <self us> | <cumulative us> | <indented module name>'
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        # nested imports are indented and already included in the cumulative time of their parent
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1e6
+
+
+def run_benchmark(
+    model_name: ModelNames,
+    n_regions: int,
+    n_goods: int,
+    base_path: str,
+    config_path: str,
+    track_memory: bool,
+) -> pd.DataFrame:
+    model_cls = get_model_class(model_name)
+    cfg = benchmark_config(model_name, base_path, config_path)
+    cfg["profiling"]["track_memory"] = track_memory
+    generator = SyntheticDataGenerator(
+        model=model_name,
+        definition=model_cls.get_definition(model_cls.ConfigCls(**cfg), historic=False),
+        dimension_files=model_cls.DimensionFilesCls(),
+        input_data_path=cfg["input"]["input_data_path"],
+        n_regions=n_regions,
+        n_goods=n_goods,
+    )
+    generator.generate()
+    os.makedirs(cfg["export"]["path"], exist_ok=True)
+
+    init_profiler = StageProfiler(track_memory=track_memory)
+    with init_profiler.stage("init"):
+        model = model_cls(cfg=cfg)
+    model.run()
+    model.export()
+
+    import_df = pd.DataFrame(
+        [
+            {
+                "name": "import",
+                "wall_time_s": import_time(
+                    ["run_remind_mfa", f"remind_mfa.{model_name.value}.{model_name.value}_model"]
+                ),
+            }
+        ]
+    )
+    df = pd.concat([import_df, init_profiler.to_df(), model.profiler.to_df()], ignore_index=True)
+    df.insert(0, "model", model_name.value)
+    df.insert(1, "n_regions", n_regions)
+    df.insert(2, "n_goods", len(model.dims["g"].items) if "g" in model.dims else None)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--models", nargs="+", default=[m.value for m in ModelNames])
+    parser.add_argument("--regions", nargs="+", type=int, default=[12])
+    parser.add_argument("--goods", type=int, default=None, help="Number of goods.")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--track-memory", action="store_true")
+    parser.add_argument("--config-path", default=os.path.join(REPO_ROOT, "config"))
+    parser.add_argument("--output", default="benchmark.csv")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, force=True)
+    results = []
+    for model_value in args.models:
+        for n_regions in args.regions:
+            for i_repeat in range(args.repeat):
+                with tempfile.TemporaryDirectory() as base_path:
+                    df = run_benchmark(
+                        model_name=ModelNames(model_value),
+                        n_regions=n_regions,
+                        n_goods=args.goods,
+                        base_path=base_path,
+                        config_path=args.config_path,
+                        track_memory=args.track_memory,
+                    )
+                df.insert(3, "repeat", i_repeat)
+                results.append(df)
+
+    results = pd.concat(results, ignore_index=True)
+    results.to_csv(args.output, index=False)
+    # stages can be run several times per model run, so sum them up before comparing repeats
+    stage_times = results.groupby(["model", "n_regions", "repeat", "name"], sort=False)[
+        "wall_time_s"
+    ].sum()
+    summary = stage_times.groupby(["model", "n_regions", "name"], sort=False).min()
+    print(summary.unstack("n_regions").to_string(float_format="%.3f"))
+
+
+if __name__ == "__main__":
+    main()